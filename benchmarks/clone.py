@@ -0,0 +1,84 @@
+"""Compares InterconnectGraph.clone() with a deep clone through locate_node().
+
+Usage:
+    python benchmarks/clone.py [chip_size] [num_tracks] [repeat]
+
+The reference copies every tile and then re-adds every connection through
+locate_node(). clone() copies the connections of every node directly,
+keeping the order of the mux inputs. Both are full deep copies; clone() is
+also measured with a local change to one tile and with a traversal of the
+whole clone afterwards.
+"""
+import sys
+import time
+from gemstone.common.dummy_core_magma import DummyCore
+from canal.cyclone import SwitchBoxSide, SwitchBoxIO, InterconnectGraph
+from canal.util import create_uniform_interconnect, SwitchBoxType
+
+
+def build_graph(chip_size: int, num_tracks: int):
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    return create_uniform_interconnect(chip_size, chip_size, 16,
+                                       lambda _, __: DummyCore(),
+                                       {"data_in_16b": in_conn,
+                                        "data_out_16b": out_conn},
+                                       {1: num_tracks},
+                                       SwitchBoxType.Wilton)
+
+
+def deep_clone(graph: InterconnectGraph):
+    new_graph = InterconnectGraph(graph.bit_width)
+    for coord in graph:
+        new_graph.add_tile(graph[coord].clone())
+    for coord in graph:
+        for node in graph[coord].get_all_nodes():
+            new_node = InterconnectGraph.locate_node(new_graph, node)
+            for n in node:
+                new_node.add_edge(InterconnectGraph.locate_node(new_graph, n),
+                                  node.get_edge_cost(n))
+    return new_graph
+
+
+def traverse(graph: InterconnectGraph):
+    num_edges = 0
+    for coord in graph:
+        for node in graph[coord].get_all_nodes():
+            num_edges += len(node)
+    return num_edges
+
+
+def local_change(graph: InterconnectGraph, x: int = 1, y: int = 1):
+    graph[x, y].switchbox.add_pipeline_register(SwitchBoxSide.NORTH, 0)
+
+
+def measure(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main():
+    chip_size = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    num_tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    graph = build_graph(chip_size, num_tracks)
+    print(f"{chip_size}x{chip_size}, {num_tracks} tracks")
+
+    deep = measure(lambda: deep_clone(graph), repeat)
+    print(f"deep clone: {deep:.3f}s")
+    results = [("clone", lambda: graph.clone()),
+               ("clone + local change", lambda: local_change(graph.clone())),
+               ("clone + traverse", lambda: traverse(graph.clone()))]
+    for name, fn in results:
+        duration = measure(fn, repeat)
+        print(f"{name}: {duration:.3f}s ({deep / duration:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Measures writing the routing graphs that Interconnect.dump_pnr() produces.
+
+Usage:
+    python benchmarks/dump_pnr.py [num_tracks] [chip_size ...]
+
+For every chip size (16, 32, 48 and 64 by default) it builds the 1-bit and
+16-bit graphs and compares a reference writer, which calls f.write() once per
+line and formats every neighbor again, with InterconnectGraph.dump_graph().
+It also measures what dump_pnr() does with a process pool: the workers are
+forked, so they inherit the graphs, and every worker writes one graph. That
+time includes starting the pool. The outputs are checked to be
+byte-identical.
+"""
+import filecmp
+import os
+import sys
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from gemstone.common.dummy_core_magma import DummyCore
+from canal.cyclone import SwitchBoxSide, SwitchBoxIO, InterconnectGraph, \
+    SwitchBoxNode
+from canal.util import create_uniform_interconnect, SwitchBoxType
+
+
+def build_graph(chip_size: int, num_tracks: int, bit_width: int):
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    pipeline_regs = [(track, side) for track in range(num_tracks)
+                     for side in SwitchBoxSide]
+    return create_uniform_interconnect(chip_size, chip_size, bit_width,
+                                       lambda _, __: DummyCore(),
+                                       {f"data_in_{bit_width}b": in_conn,
+                                        f"data_out_{bit_width}b": out_conn},
+                                       {1: num_tracks},
+                                       SwitchBoxType.Wilton,
+                                       pipeline_regs)
+
+
+def reference_dump_graph(graph: InterconnectGraph, filename: str):
+    # the original writer: one write per line
+    switches = {}
+    for coord in graph:
+        switchbox = graph[coord].switchbox
+        switches.setdefault(switchbox.id, switchbox)
+    with open(filename, "w+") as f:
+        def write_conn(node_):
+            if len(node_) == 0:
+                return
+            f.write("  " + node_.node_str() + "\n")
+            f.write("  BEGIN\n")
+            for n in node_:
+                if isinstance(node_, SwitchBoxNode) and \
+                        isinstance(n, SwitchBoxNode):
+                    if node_.x == n.x and node_.y == n.y:
+                        continue
+                f.write("      " + n.node_str() + "\n")
+            f.write("  END\n")
+
+        for switch_id in sorted(switches):
+            switch = switches[switch_id]
+            f.write(str(switch) + "\n")
+            f.write("BEGIN\n")
+            for track_from, side_from, track_to, side_to in \
+                    switch.internal_wires:
+                f.write("  " + " ".join([str(track_from),
+                                         str(side_from.value),
+                                         str(track_to),
+                                         str(side_to.value)]) + "\n")
+            f.write("END\n")
+        for coord in graph:
+            tile = graph[coord]
+            f.write(str(tile) + "\n")
+            for node in tile.get_all_nodes():
+                write_conn(node)
+
+
+# same as the worker of Interconnect.dump_pnr()
+_graphs = {}
+
+
+def set_graphs(graphs):
+    global _graphs
+    _graphs = graphs
+
+
+def dump_graph(bit_width: int, filename: str):
+    _graphs[bit_width].dump_graph(filename)
+
+
+def measure(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    chip_sizes = [int(size) for size in sys.argv[2:]] or [16, 32, 48, 64]
+
+    for chip_size in chip_sizes:
+        graphs = {bit_width: build_graph(chip_size, num_tracks, bit_width)
+                  for bit_width in (1, 16)}
+        with tempfile.TemporaryDirectory() as tempdir:
+            def get_path(name, bit_width):
+                return os.path.join(tempdir, f"{name}_{bit_width}.graph")
+
+            def run_reference():
+                for bit_width, graph in graphs.items():
+                    reference_dump_graph(graph, get_path("ref", bit_width))
+
+            def run_serial():
+                for bit_width, graph in graphs.items():
+                    graph.dump_graph(get_path("serial", bit_width))
+
+            def run_processes():
+                context = multiprocessing.get_context("fork")
+                with ProcessPoolExecutor(len(graphs), context, set_graphs,
+                                         (graphs,)) as pool:
+                    futures = [pool.submit(dump_graph, bit_width,
+                                           get_path("processes", bit_width))
+                               for bit_width in graphs]
+                    for future in futures:
+                        future.result()
+
+            reference = measure(run_reference)
+            serial = measure(run_serial)
+            processes = measure(run_processes)
+            for bit_width in graphs:
+                for name in ("serial", "processes"):
+                    assert filecmp.cmp(get_path("ref", bit_width),
+                                       get_path(name, bit_width),
+                                       shallow=False)
+            size = sum(os.path.getsize(get_path("ref", bit_width))
+                       for bit_width in graphs)
+        print(f"{chip_size}x{chip_size}, {num_tracks} tracks, "
+              f"{size / 1e6:.1f}MB: reference {reference:.3f}s, "
+              f"buffered {serial:.3f}s ({reference / serial:.1f}x), "
+              f"processes {processes:.3f}s ({reference / processes:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measures the memory footprint of the routing graph nodes.
+
+Usage:
+    python benchmarks/node_memory.py [chip_size] [num_tracks]
+
+It builds a uniform interconnect (32x32 by default) and reports both the
+total traced allocation per node and the size of the node objects plus
+their adjacency containers.
+"""
+import sys
+import tracemalloc
+from gemstone.common.dummy_core_magma import DummyCore
+from canal.cyclone import SwitchBoxSide, SwitchBoxIO, Node
+from canal.util import create_uniform_interconnect, SwitchBoxType
+
+
+def build_graph(chip_size: int, num_tracks: int):
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    pipeline_regs = [(track, side) for track in range(num_tracks)
+                     for side in SwitchBoxSide]
+    return create_uniform_interconnect(chip_size, chip_size, 16,
+                                       lambda _, __: DummyCore(),
+                                       {"data_in_16b": in_conn,
+                                        "data_out_16b": out_conn},
+                                       {1: num_tracks},
+                                       SwitchBoxType.Wilton,
+                                       pipeline_regs)
+
+
+def get_attributes(node: Node):
+    # works for both the __dict__ based and the __slots__ based nodes
+    values = list(getattr(node, "__dict__", {}).values())
+    for cls in type(node).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if name.startswith("__"):
+                name = f"_{cls.__name__}{name}"
+            values.append(getattr(node, name))
+    return values
+
+
+def node_size(node: Node) -> int:
+    """size of the node object and its adjacency containers"""
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    for value in get_attributes(node):
+        if isinstance(value, (dict, list)) or \
+                type(value).__name__ == "OrderedSet":
+            size += sys.getsizeof(value)
+    return size
+
+
+def main():
+    chip_size = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    num_tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    tracemalloc.start()
+    graph = build_graph(chip_size, num_tracks)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = []
+    for coord in graph:
+        nodes += graph[coord].get_all_nodes()
+    num_nodes = len(nodes)
+    shallow = sum(node_size(node) for node in nodes)
+    print(f"{chip_size}x{chip_size}, {num_tracks} tracks: {num_nodes} nodes")
+    print(f"traced allocation: {traced / num_nodes:.1f} bytes/node")
+    print(f"node objects and adjacency: {shallow / num_nodes:.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compares pickling InterconnectGraph with the default pickling of its nodes.
+
+Usage:
+    python benchmarks/pickle_graph.py [num_tracks] [chip_size ...]
+
+For every chip size (8, 16, 32 and 48 by default) it builds a 16-bit graph
+and measures the pickle time, the unpickle time and the pickle size.
+InterconnectGraph pickles itself in the binary graph format. The reference
+pickles the graph attributes as is, which recurses through the connections
+of the nodes, with the cores replaced by their signatures as
+InterconnectGraph does; it runs in a thread with a large stack and a raised recursion
+limit, and is reported as failed if it raises.
+"""
+import io
+import pickle
+import sys
+import threading
+import time
+from gemstone.common.dummy_core_magma import DummyCore
+from canal.cyclone import SwitchBoxSide, SwitchBoxIO, InterconnectGraph, \
+    InterconnectCore, CoreSignature
+from canal.util import create_uniform_interconnect, SwitchBoxType
+
+
+def build_graph(chip_size: int, num_tracks: int):
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    return create_uniform_interconnect(chip_size, chip_size, 16,
+                                       lambda _, __: DummyCore(),
+                                       {"data_in_16b": in_conn,
+                                        "data_out_16b": out_conn},
+                                       {1: num_tracks},
+                                       SwitchBoxType.Wilton)
+
+
+class ReferencePickler(pickle.Pickler):
+    # pickles the attributes of the graph instead of calling __reduce__
+    def reducer_override(self, obj):
+        if isinstance(obj, InterconnectGraph):
+            return object.__reduce_ex__(obj, pickle.HIGHEST_PROTOCOL)
+        if isinstance(obj, InterconnectCore) and \
+                not isinstance(obj, CoreSignature):
+            # magma cores can't be pickled
+            return CoreSignature(obj).__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+        return NotImplemented
+
+
+def reference_dumps(graph: InterconnectGraph) -> bytes:
+    with io.BytesIO() as f:
+        ReferencePickler(f, pickle.HIGHEST_PROTOCOL).dump(graph)
+        return f.getvalue()
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run_reference(graph: InterconnectGraph) -> str:
+    result = {}
+
+    def run():
+        try:
+            dump_time, data = measure(lambda: reference_dumps(graph))
+            result["message"] = f"pickle {dump_time:.3f}s, " \
+                                f"{len(data) / 1e6:.1f}MB"
+            load_time, _ = measure(lambda: pickle.loads(data))
+            result["message"] += f", unpickle {load_time:.3f}s"
+        except (RecursionError, AttributeError) as ex:
+            result["message"] = result.get("message", "pickle") + \
+                f" failed: {type(ex).__name__}"
+
+    recursion_limit = sys.getrecursionlimit()
+    stack_size = threading.stack_size(512 * 1024 * 1024)
+    sys.setrecursionlimit(1000000)
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+        threading.stack_size(stack_size)
+    return result["message"]
+
+
+def main():
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    chip_sizes = [int(size) for size in sys.argv[2:]] or [8, 16, 32, 48]
+
+    for chip_size in chip_sizes:
+        graph = build_graph(chip_size, num_tracks)
+        reference = run_reference(graph)
+        dump_time, data = measure(lambda: pickle.dumps(graph))
+        load_time, loaded = measure(lambda: pickle.loads(data))
+        assert loaded.freeze().targets == graph.freeze().targets
+        print(f"{chip_size}x{chip_size}, {num_tracks} tracks: "
+              f"binary pickle {dump_time:.3f}s, {len(data) / 1e6:.1f}MB, "
+              f"unpickle {load_time:.3f}s; reference {reference}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import coreir
 from .cyclone import InterconnectGraph, SwitchBoxSide, SwitchBoxIO, Node,\
-    RegisterMuxNode, Tile, SwitchBoxNode, RegisterNode, SwitchBox, PortNode
+    RegisterMuxNode, Tile, SwitchBoxNode, RegisterNode, SwitchBox, PortNode, \
+    NodeKey, NodeType
 import os
 from typing import Dict, List, Tuple, Set, Union
 
@@ -36,7 +37,6 @@ def get_node(graphs: Dict[int, InterconnectGraph],
     bit_width = int(bit_width_str[1:])
     assert bit_width in graphs
     graph = graphs[bit_width]
-    tile = graph.get_tile(x, y)
 
     if node_type == "SB":
         assert len(node_info) == 6
@@ -49,12 +49,16 @@ def get_node(graphs: Dict[int, InterconnectGraph],
         node_side = SwitchBoxSide[side_str]
         node_io_str = node_info[2] + "_" + node_info[3]
         node_io = SwitchBoxIO[node_io_str]
-        sb_node = tile.get_sb(node_side, track_num, node_io)
-        return sb_node
+        key = NodeKey(NodeType.SwitchBox, x, y, track_num, node_side, node_io,
+                      None, bit_width)
     elif node_type == "REG":
         assert len(node_info) == 4
         reg_name = f"{node_info[1]}_{node_info[2]}"
-        return tile.switchbox.registers[reg_name]
+        track_str = node_info[1]
+        assert track_str[0] == "T"
+        track_num = int(track_str[1:])
+        key = NodeKey(NodeType.Register, x, y, track_num, None, None,
+                      reg_name, bit_width)
     elif node_type == "RMUX":
         node_info.pop(0)
         track_str = node_info[0]
@@ -63,9 +67,14 @@ def get_node(graphs: Dict[int, InterconnectGraph],
         side_str = node_info[1]
         node_side = SwitchBoxSide[side_str]
         mux_name = f"{node_side.value}_{track_num}"
-        return tile.switchbox.reg_muxs[mux_name]
+        key = NodeKey(NodeType.RegisterMux, x, y, track_num, node_side, None,
+                      mux_name, bit_width)
     else:
         raise NotImplementedError(node_str)
+    node = graph.find_node(key)
+    if node is None:
+        raise KeyError(node_str)
+    return node
 
 
 def get_tile_coord(tile_str):
@@ -313,7 +322,7 @@ def verify_sb_rtl(graphs: Dict[int, InterconnectGraph],
             dst_node = get_node(graphs, dst, x, y)
             assert dst_node in src_node
             # check the index is correct as well
-            assert index == dst_node.get_conn_in().index(src_node)
+            assert index == dst_node.conn_in_index(src_node)
             checked_node_connection.add((src_node, dst_node))
 
         # the last, verify some other logistics connections
@@ -365,7 +374,7 @@ def verify_sb_cyclone(switchbox: SwitchBox,
         assert dst_sb in src_sb
         src_name = get_mux_str(src_sb)
         dst_name = get_mux_str(dst_sb)
-        index = str(dst_sb.get_conn_in().index(src_sb))
+        index = str(dst_sb.conn_in_index(src_sb))
         _check_connection(src_name, dst_name, index)
 
     # check pipeline registers
@@ -384,8 +393,8 @@ def verify_sb_cyclone(switchbox: SwitchBox,
             reg_module_name = str(reg_node)
             rmux_module_name = str(reg_mux)
             sb_mux_name = get_mux_str(sb_node)
-            index_reg = str(reg_mux.get_conn_in().index(reg_node))
-            index_sb = str(reg_mux.get_conn_in().index(sb_node))
+            index_reg = str(reg_mux.conn_in_index(reg_node))
+            index_sb = str(reg_mux.conn_in_index(sb_node))
             _check_connection(reg_module_name, rmux_module_name, index_reg)
             _check_connection(sb_mux_name, rmux_module_name, index_sb)
 
@@ -432,7 +441,7 @@ def verify_port_rtl(graphs: Dict[int, InterconnectGraph],
                     assert sb_node in port_node
                     assert port_node in sb_node.get_conn_in()
                     index = int(dst_[-1])
-                    assert sb_node.get_conn_in().index(port_node) == index
+                    assert sb_node.conn_in_index(port_node) == index
                     # add it to the list
                     checked_node_connection.add((port_node, sb_node))
         else:
@@ -453,9 +462,7 @@ def verify_port_rtl(graphs: Dict[int, InterconnectGraph],
                     sb_node = get_node(graphs, sb_name, x, y)
                     index = int(dst_[-1])
                     assert port_node in sb_node
-                    conn_in = port_node.get_conn_in()
-                    assert sb_node in conn_in
-                    assert index == conn_in.index(sb_node)
+                    assert index == port_node.conn_in_index(sb_node)
                     # add it to the list
                     checked_node_connection.add((sb_node, port_node))
 
@@ -513,7 +520,7 @@ def verify_port_cyclone(tile: Tile,
                             and dst[0] == sb_name \
                             and dst[1] == "I":
                         found = True
-                        index = sb_node.get_conn_in().index(port_node)
+                        index = sb_node.conn_in_index(port_node)
                         assert index == int(dst[-1])
                         break
                 assert found
@@ -7,7 +7,7 @@ from zelus import MuxA as Mux, MuxDefault, ConfigRegister, Register
 from .cyclone import Node, PortNode, Tile, SwitchBoxNode, SwitchBoxIO, \
     SwitchBox, InterconnectCore, RegisterNode, RegisterMuxNode
 
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Union, Hashable
 
 
 def create_name(name: str):
@@ -287,7 +287,7 @@ class SB(InterconnectConfigurable):
                         assert node.io == SwitchBoxIO.SB_OUT
                         assert node.x == sb.x and node.y == sb.y
                         output_port = mux.ports.O
-                        idx = node.get_conn_in().index(sb)
+                        idx = node.conn_in_index(sb)
                         node_, node_mux = self.sb_muxs[str(node)]
                         assert node_ == node
                         input_port = node_mux.ports.I[idx]
@@ -305,7 +305,7 @@ class SB(InterconnectConfigurable):
                         self.wire(mux.ports.O, reg.ports.I)
                     elif isinstance(node, RegisterMuxNode):
                         assert len(node.get_conn_in()) == 2
-                        idx = node.get_conn_in().index(sb)
+                        idx = node.conn_in_index(sb)
                         sb_name = str(sb)
                         n, reg_mux = self.reg_muxs[sb_name]
                         assert n == node
@@ -328,7 +328,7 @@ class SB(InterconnectConfigurable):
             sb_name = str(sb_node)
             n, mux = self.reg_muxs[sb_name]
             assert n == reg_mux_node
-            idx = reg_mux_node.get_conn_in().index(node)
+            idx = reg_mux_node.conn_in_index(node)
             # wire 3
             self.wire(reg.ports.O, mux.ports.I[idx])
 
@@ -340,15 +340,25 @@ class TileCircuit(Generator):
 
     We don't deal with stall signal here since it's not interconnect's job
     to handle that signal
+
+    If definition is set, the tile is a clone of it, and both have to have
+    the same signature (see get_signature()). A clone is an instance of the
+    definition's module: it uses the definition's SB and CB circuits for
+    configuration and only declares the same ports, instead of building the
+    circuits again.
     """
 
     def __init__(self, tiles: Dict[int, Tile],
                  config_addr_width: int, config_data_width: int,
                  tile_id_width: int = 16,
                  full_config_addr_width: int = 32,
-                 stall_signal_width: int = 4, is_clone: bool = False):
+                 stall_signal_width: int = 4, is_clone: bool = False,
+                 definition: "TileCircuit" = None):
 
         self.tiles = tiles
+        self.definition = definition
+        if definition is not None:
+            is_clone = True
         self.config_addr_width = config_addr_width
         self.config_data_width = config_data_width
         self.tile_id_width = tile_id_width
@@ -392,6 +402,16 @@ class TileCircuit(Generator):
         # good to go
         super().__init__(self.__name(), is_clone=is_clone)
 
+        if definition is not None:
+            # same as Generator.create() does for its clones
+            self.internal_generator.def_instance = \
+                definition.internal_generator
+            self.cbs: Dict[str, CB] = dict(definition.cbs)
+            self.sbs: Dict[int, SB] = dict(definition.sbs)
+            self.__add_definition_ports()
+            self.__init_features()
+            return
+
         # create cb and switchbox
         self.cbs: Dict[str, CB] = {}
         self.sbs: Dict[int, SB] = {}
@@ -479,7 +499,7 @@ class TileCircuit(Generator):
                         # for IO tiles they have connections to other tiles
                         if sb_node.x != self.x or sb_node.y != self.y:
                             continue
-                        idx = sb_node.get_conn_in().index(port_node)
+                        idx = sb_node.conn_in_index(port_node)
                         sb_circuit = self.sbs[port_node.width]
                         # we need to find the actual mux
                         n, mux = sb_circuit.sb_muxs[str(sb_node)]
@@ -502,6 +522,9 @@ class TileCircuit(Generator):
         # lift ports if there is empty sb
         self.__lift_ports()
 
+        self.__init_features()
+
+    def __init_features(self):
         # tile ID
         self.instance_name = f"Tile_X{self.x:02X}_Y{self.y:02X}"
 
@@ -530,6 +553,10 @@ class TileCircuit(Generator):
         self.read_data_mux: MuxWithDefaultWrapper = None
 
         self.finalized = False
+        # (src, dst) -> (reg_index, feature_addr, config_data). built by
+        # get_route_configs() and dropped whenever a feature is added
+        self.__route_configs: Union[Dict[Tuple[Node, Node],
+                                         Tuple[int, int, int]], None] = None
 
         hash_value = hash(self.name())
         for sb in self.sbs.values():
@@ -539,6 +566,49 @@ class TileCircuit(Generator):
         self.set_hash(hash_value)
         self.set_skip_hash(False)
 
+    def __add_definition_ports(self):
+        # the logic behind the ports belongs to the definition
+        for port_name in self.definition.ports:
+            if port_name not in self.ports:
+                self.port_from_def(self.definition.ports[port_name])
+
+    @staticmethod
+    def get_signature(tiles: Dict[int, Tile]) -> Hashable:
+        """structure of the tiles at one coordinate, which is everything the
+        circuit is built from: the core, the switch boxes and every node with
+        its connections. Nodes are keyed relative to the tile, so tiles at
+        different coordinates with the same signature can share one circuit
+        """
+        signature = []
+        for bit_width, tile in tiles.items():
+            x, y = tile.x, tile.y
+            # id(node) -> relative key
+            node_keys = {}
+
+            def get_node_key(n: Node):
+                result = node_keys.get(id(n))
+                if result is None:
+                    key = n.key()
+                    result = (key.kind, key.x - x, key.y - y) + key[3:]
+                    node_keys[id(n)] = result
+                return result
+
+            core = tile.core
+            if core is None or core.core is None:
+                core_signature = None
+            else:
+                core_signature = (core.core.name(), tuple(core.inputs()),
+                                  tuple(core.outputs()))
+            nodes = []
+            for node in tile.get_all_nodes():
+                nodes.append((get_node_key(node),
+                              tuple(map(get_node_key, node.get_conn_in())),
+                              tuple(map(get_node_key, node))))
+            signature.append((bit_width, tile.height, core_signature,
+                              tile.switchbox.id, tile.switchbox.num_track,
+                              tuple(nodes)))
+        return tuple(signature)
+
     def __add_tile_id(self):
         self.add_port("tile_id",
                       magma.In(magma.Bits[self.tile_id_width]))
@@ -590,6 +660,13 @@ class TileCircuit(Generator):
         if self.finalized:
             raise Exception("Circuit already finalized")
         self.finalized = True
+        if self.definition is not None:
+            # the definition's finalize() adds the logic, the clone only
+            # needs the ports that come with it
+            if not self.definition.finalized:
+                self.definition.finalize()
+            self.__add_definition_ports()
+            return
         # add stall and reset signal
         self.__add_stall()
         self.__add_reset()
@@ -679,11 +756,59 @@ class TileCircuit(Generator):
     def add_feature(self, feature: generator.Generator):
         assert isinstance(feature, generator.Generator)
         self.__features.append(feature)
+        self.__route_configs = None
 
     def features(self) -> List[generator.Generator]:
         return self.__features
 
+    def get_route_configs(self) \
+            -> Dict[Tuple[Node, Node], Tuple[int, int, int]]:
+        """(src, dst) -> (reg_index, feature_addr, config_data) of every
+        configurable connection that ends in this tile, which
+        get_route_bitstream_config() looks up. The table is kept until a
+        feature is added"""
+        if self.__route_configs is not None:
+            return self.__route_configs
+        route_configs = {}
+        # id of the feature -> its first index, same as features().index()
+        feature_addrs: Dict[int, int] = {}
+        for feature_addr, feature in enumerate(self.features()):
+            feature_addrs.setdefault(id(feature), feature_addr)
+        # id of the circuit -> mux select name -> register index
+        reg_indices: Dict[int, Dict[str, int]] = {}
+        for bit_width, tile in self.tiles.items():
+            for node in tile.get_all_nodes():
+                if isinstance(node, (SwitchBoxNode, RegisterMuxNode)):
+                    circuit = self.sbs.get(bit_width)
+                elif isinstance(node, PortNode):
+                    circuit = self.cbs.get(node.name)
+                else:
+                    continue
+                if circuit is None or id(circuit) not in feature_addrs:
+                    continue
+                if id(circuit) not in reg_indices:
+                    config_names = sorted(circuit.registers.keys())
+                    reg_indices[id(circuit)] = {
+                        name: reg_index
+                        for reg_index, name in enumerate(config_names)}
+                reg_index = reg_indices[id(circuit)].get(
+                    get_mux_sel_name(node))
+                if reg_index is None:
+                    # a single input, which has nothing to configure
+                    continue
+                feature_addr = feature_addrs[id(circuit)]
+                for config_data, src_node in enumerate(node.get_conn_in()):
+                    route_configs[(src_node, node)] = \
+                        reg_index, feature_addr, config_data
+        self.__route_configs = route_configs
+        return route_configs
+
     def get_route_bitstream_config(self, src_node: Node, dst_node: Node):
+        config = self.get_route_configs().get((src_node, dst_node))
+        if config is not None:
+            return config
+        # not a configurable connection of this tile. the checks below
+        # report why
         assert src_node.width == dst_node.width
         tile = self.tiles[src_node.width]
         assert dst_node.x == tile.x and dst_node.y == tile.y, \
@@ -691,7 +816,7 @@ class TileCircuit(Generator):
         assert dst_node in src_node, \
             f"{dst_node} is not connected to {src_node}"
 
-        config_data = dst_node.get_conn_in().index(src_node)
+        config_data = dst_node.conn_in_index(src_node)
         # find the circuit
         if isinstance(dst_node, SwitchBoxNode):
             circuit = self.sbs[src_node.width]
@@ -5,12 +5,20 @@ with adjustments due to language difference.
 
 """
 import enum
-from typing import List, Tuple, Dict, Union, NamedTuple, Iterator
+import io
+import mmap
+import struct
+import sys
+from array import array
+from typing import List, Tuple, Dict, Union, NamedTuple, Iterator, \
+    Iterable, Set, Sequence, Callable, Hashable
 from ordered_set import OrderedSet
 from abc import abstractmethod
 
 
 MAX_DEFAULT_DELAY = 100000
+# bumped whenever the layout of the binary graph format changes
+BINARY_GRAPH_VERSION = 1
 
 
 @enum.unique
@@ -19,6 +27,7 @@ class NodeType(enum.Enum):
     Port = enum.auto()
     Register = enum.auto()
     Generic = enum.auto()
+    RegisterMux = enum.auto()
 
 
 @enum.unique
@@ -54,6 +63,13 @@ class SwitchBoxIO(enum.Enum):
     SB_OUT = 1
 
 
+# (track_from, side_from, track_to, side_to)
+SBWire = Tuple[int, SwitchBoxSide, int, SwitchBoxSide]
+# (side_from, track_from) -> ((track_to, side_to), ...)
+SBFanOutIndex = Dict[Tuple[SwitchBoxSide, int],
+                     Tuple[Tuple[int, SwitchBoxSide], ...]]
+
+
 class SBConnectionType(NamedTuple):
     side: SwitchBoxSide
     track: int
@@ -65,6 +81,19 @@ class InterconnectPolicy(enum.Enum):
     Ignore = enum.auto()
 
 
+class NodeKey(NamedTuple):
+    """canonical key of a node. Fields that do not apply to the node type
+    are None"""
+    kind: NodeType
+    x: int
+    y: int
+    track: Union[int, None]
+    side: Union[SwitchBoxSide, None]
+    io: Union[SwitchBoxIO, None]
+    name: Union[str, None]
+    width: int
+
+
 class InterconnectCore:
     @abstractmethod
     def inputs(self) -> List[Tuple[int, str]]:
@@ -83,42 +112,182 @@ class InterconnectCore:
         pass
 
 
+class CoreSignature(InterconnectCore):
+    """The ports of a core without the core itself. Cores are usually magma
+    or kratos objects that can't be pickled, so pickled graphs hold the
+    signatures of their cores instead. Like CoreInterface.core, core is the
+    name of the wrapped core, or None for empty tiles. There is no port
+    reference to return, so set the actual core of the tile again before
+    generating any circuit from the graph"""
+    def __init__(self, core: InterconnectCore):
+        self.input_ports: Tuple[Tuple[int, str], ...] = tuple(core.inputs())
+        self.output_ports: Tuple[Tuple[int, str], ...] = \
+            tuple(core.outputs())
+        if isinstance(core, CoreSignature):
+            self.core = core.core
+        else:
+            wrapped = getattr(core, "core", None)
+            self.core = None if wrapped is None else wrapped.name()
+
+    def inputs(self):
+        return list(self.input_ports)
+
+    def outputs(self):
+        return list(self.output_ports)
+
+    def get_port_ref(self, port_name: str):
+        raise ValueError(f"{port_name}: core signatures do not hold the "
+                         f"core, set the core of the tile first")
+
+    def __eq__(self, other):
+        if not isinstance(other, CoreSignature):
+            return False
+        return self.core == other.core and \
+            self.input_ports == other.input_ports and \
+            self.output_ports == other.output_ports
+
+    def __hash__(self):
+        return hash((self.core, self.input_ports, self.output_ports))
+
+
+class GraphRevision:
+    """Modification counter shared by a graph, its tiles and its nodes. Data
+    derived from the graph, such as the node registry, remembers the revision
+    it was computed from and is rebuilt once the counter moves on."""
+    __slots__ = ("nodes", "wiring", "edges")
+
+    def __init__(self):
+        # bumped whenever nodes are added to or removed from the graph
+        self.nodes = 0
+        # bumped whenever the internal wiring of a switch box changes
+        self.wiring = 0
+        # bumped whenever a connection is added or removed
+        self.edges = 0
+
+
 class Node:
+    """Base class of every node in the routing graph.
+
+    Nodes use __slots__ since a large fabric creates millions of them. The
+    out-going connections are stored in a single dict, which maps the
+    neighbor to the edge delay. Python dicts preserve insertion order, so
+    iterating through the node yields neighbors in the order they were
+    connected.
+    """
+    TYPE = NodeType.Generic
+
+    __slots__ = ("x", "y", "width", "__neighbors", "__conn_ins",
+                 "__conn_in_index", "__hash", "__revision")
+
     def __init__(self, x: int, y: int, width: int):
         self.x = x
         self.y = y
         self.width = width
 
-        self.__neighbors = OrderedSet()
-        self.__conn_ins = []
-        self.__edge_cost = {}
+        # neighbor -> edge delay
+        self.__neighbors: Dict[Node, int] = {}
+        self.__conn_ins: List[Node] = []
+        # source node -> mux input index. lazily created
+        self.__conn_in_index: Union[Dict[Node, int], None] = None
+        self.__hash: Union[int, None] = None
+        # set when the node is added to a graph
+        self.__revision: Union[GraphRevision, None] = None
+
+    def attach(self, revision: GraphRevision):
+        """attaches the node to the graph that owns revision, so that
+        connection changes are recorded"""
+        self.__revision = revision
+
+    def __touch(self, node: Union["Node", None] = None):
+        # record a connection change between self and node
+        revision = self.__revision
+        if revision is not None:
+            revision.edges += 1
+        if node is not None and node.__revision is not revision and \
+                node.__revision is not None:
+            node.__revision.edges += 1
 
     def add_edge(self, node: "Node", delay: int = 0,
                  force_connect: bool = False):
         if not force_connect:
             assert self.width == node.width
         if node not in self.__neighbors:
-            self.__neighbors.add(node)
+            self.__neighbors[node] = delay
+            if node.__conn_in_index is not None:
+                node.__conn_in_index[self] = len(node.__conn_ins)
             node.__conn_ins.append(self)
-            self.__edge_cost[node] = delay
+            self.__touch(node)
 
     def remove_edge(self, node: "Node"):
         if node in self.__neighbors:
-            self.__edge_cost.pop(node)
-            self.__neighbors.remove(node)
+            self.__neighbors.pop(node)
+            self.__touch(node)
 
             # remove the incoming connections as well
-            node.__conn_ins.remove(self)
+            conn_ins = node.__conn_ins
+            conn_in_index = node.__conn_in_index
+            if conn_in_index is None:
+                conn_ins.remove(self)
+            else:
+                index = conn_in_index.pop(self)
+                conn_ins.pop(index)
+                # shift the index of the connections after it
+                for i in range(index, len(conn_ins)):
+                    conn_in_index[conn_ins[i]] = i
+
+    def replace_edge(self, node: "Node", new_node: "Node"):
+        """moves the edge self -> node to new_node -> node, keeping the edge
+        delay. new_node takes the place of self in node.get_conn_in(), so the
+        mux select value of the connection doesn't change"""
+        assert new_node.width == node.width
+        if new_node in node.__conn_ins:
+            raise ValueError(f"{new_node} is already connected to {node}")
+        index = node.conn_in_index(self)
+        new_node.__neighbors[node] = self.__neighbors.pop(node)
+        node.__conn_ins[index] = new_node
+        node.__conn_in_index.pop(self)
+        node.__conn_in_index[new_node] = index
+        self.__touch(node)
+        new_node.__touch(node)
+
+    def set_connections(self, neighbors: Dict["Node", int],
+                        conn_ins: List["Node"]):
+        """replaces the connections of this node with neighbor -> edge delay
+        and the mux inputs in select order. The connections of the other
+        nodes are not updated"""
+        self.__neighbors = neighbors
+        self.__conn_ins = conn_ins
+        self.__conn_in_index = None
+        self.__touch()
+
+    def copy_connections(self, node: "Node", nodes: Dict[int, "Node"]):
+        """replaces the connections of this node with the ones of node, which
+        belongs to another graph. nodes maps id() of every node of the other
+        graph to the node of this graph. Edge delays and the order of the mux
+        inputs are kept"""
+        self.__neighbors = {nodes[id(n)]: delay
+                            for n, delay in node.__neighbors.items()}
+        self.__conn_ins = [nodes[id(n)] for n in node.__conn_ins]
+        self.__conn_in_index = None
+        self.__touch()
 
     def get_edge_cost(self, node: "Node") -> int:
-        if node not in self.__edge_cost:
-            return MAX_DEFAULT_DELAY
-        else:
-            return self.__edge_cost[node]
+        return self.__neighbors.get(node, MAX_DEFAULT_DELAY)
 
     def get_conn_in(self) -> List["Node"]:
         return self.__conn_ins
 
+    def conn_in_index(self, node: "Node") -> int:
+        """returns the index of node in get_conn_in(), which is the mux
+        select value of the connection node -> self"""
+        if self.__conn_in_index is None:
+            self.__conn_in_index = {n: i for i, n in
+                                    enumerate(self.__conn_ins)}
+        index = self.__conn_in_index.get(node)
+        if index is None:
+            raise ValueError(f"{node} is not connected to {self}")
+        return index
+
     def __iter__(self) -> Iterator["Node"]:
         return iter(self.__neighbors)
 
@@ -135,17 +304,38 @@ class Node:
 
     def clear(self):
         self.__neighbors.clear()
-        self.__edge_cost.clear()
         self.__conn_ins.clear()
+        self.__conn_in_index = None
+        self.__touch()
 
     def __contains__(self, item):
         return item in self.__neighbors
 
+    def get_memory_usage(self) -> Tuple[int, int]:
+        """estimated size in bytes of the node itself and of its connection
+        containers"""
+        size = sys.getsizeof(self)
+        conn_size = sys.getsizeof(self.__neighbors) + \
+            sys.getsizeof(self.__conn_ins)
+        if self.__conn_in_index is not None:
+            conn_size += sys.getsizeof(self.__conn_in_index)
+        return size, conn_size
+
+    def key(self) -> NodeKey:
+        return NodeKey(self.TYPE, self.x, self.y, None, None, None, None,
+                       self.width)
+
     def __hash__(self):
-        return hash(self.width) ^ hash(self.x) ^ hash(self.y)
+        if self.__hash is None:
+            self.__hash = hash(self.key())
+        return self.__hash
 
 
 class PortNode(Node):
+    TYPE = NodeType.Port
+
+    __slots__ = ("name", )
+
     def __init__(self, name: str, x: int, y: int, width: int):
         super().__init__(x, y, width)
 
@@ -157,11 +347,16 @@ class PortNode(Node):
     def __repr__(self):
         return f"CB_{self.name}"
 
-    def __hash__(self):
-        return super().__hash__() ^ hash(self.name)
+    def key(self) -> NodeKey:
+        return NodeKey(self.TYPE, self.x, self.y, None, None, None, self.name,
+                       self.width)
 
 
 class RegisterNode(Node):
+    TYPE = NodeType.Register
+
+    __slots__ = ("name", "track")
+
     def __init__(self, name: str, x: int, y: int, track: int, width: int):
         super().__init__(x, y, width)
 
@@ -175,11 +370,16 @@ class RegisterNode(Node):
     def __repr__(self):
         return f"REG_{self.name}_B{self.width}"
 
-    def __hash__(self):
-        return super().__hash__() ^ hash(self.name) ^ hash(self.track)
+    def key(self) -> NodeKey:
+        return NodeKey(self.TYPE, self.x, self.y, self.track, None, None,
+                       self.name, self.width)
 
 
 class SwitchBoxNode(Node):
+    TYPE = NodeType.SwitchBox
+
+    __slots__ = ("track", "side", "io")
+
     def __init__(self, x: int, y: int, track: int, width: int,
                  side: SwitchBoxSide, io: SwitchBoxIO):
         super().__init__(x, y, width)
@@ -195,12 +395,16 @@ class SwitchBoxNode(Node):
     def __repr__(self):
         return f"SB_T{self.track}_{self.side.name}_{self.io.name}_B{self.width}"
 
-    def __hash__(self):
-        return super().__hash__() ^ hash(self.track) ^ hash(self.side) ^ \
-            hash(self.io)
+    def key(self) -> NodeKey:
+        return NodeKey(self.TYPE, self.x, self.y, self.track, self.side,
+                       self.io, None, self.width)
 
 
 class RegisterMuxNode(Node):
+    TYPE = NodeType.RegisterMux
+
+    __slots__ = ("track", "side", "name")
+
     def __init__(self, x: int, y: int, track: int, width: int,
                  side: SwitchBoxSide):
         super().__init__(x, y, width)
@@ -217,14 +421,23 @@ class RegisterMuxNode(Node):
     def __repr__(self):
         return f"RMUX_T{self.track}_{self.side.name}_B{self.width}"
 
-    def __hash__(self):
-        return super().__hash__() ^ hash(self.track) ^ hash(self.side)
+    def key(self) -> NodeKey:
+        return NodeKey(self.TYPE, self.x, self.y, self.track, self.side, None,
+                       self.name, self.width)
 
 
 class SwitchBox:
+    """A switch box is described by its internal wiring pattern. The
+    SwitchBoxNode objects and the internal connections are only created
+    when a node is first requested, e.g. through get_sb(), get_all_sbs()
+    or __getitem__(). A switch box that is only used as a template for
+    Tile, such as DisjointSwitchBox passed to the tile constructor, never
+    creates any node. Tiles share the wiring list of their template, and
+    switch boxes of the same kind share the pattern cached by
+    SwitchBoxHelper, so the wires are never modified in place.
+    """
     def __init__(self, x: int, y: int, num_track: int, width: int,
-                 internal_wires: List[Tuple[int, SwitchBoxSide,
-                                            int, SwitchBoxSide]]):
+                 internal_wires: Sequence[SBWire]):
         self.x = x
         self.y = y
         self.width = width
@@ -234,28 +447,10 @@ class SwitchBox:
 
         self.id = 0
 
-        self.__sbs: List[List[List[SwitchBoxNode]]] = \
-            [[[None for _ in range(self.num_track)]
-              for _ in SwitchBoxIO] for _ in SwitchBoxSide]
-
-        # construct the internal connections
-        for side in SwitchBoxSide:
-            for io in SwitchBoxIO:
-                for track in range(self.num_track):
-                    node = SwitchBoxNode(self.x, self.y, track, width,
-                                         side, io)
-                    self.__sbs[side.value][io.value][track] = node
-
-        # assign internal wiring
-        # the order is in -> out
-        for conn in self.internal_wires:
-            track_from, side_from, track_to, side_to = conn
-            sb_from = \
-                self.__sbs[side_from.value][SwitchBoxIO.SB_IN.value][track_from]
-            sb_to = \
-                self.__sbs[side_to.value][SwitchBoxIO.SB_OUT.value][track_to]
-            # internal sb connection has no delay
-            sb_from.add_edge(sb_to, 0)
+        # created on demand
+        self.__sbs: Union[List[List[List[SwitchBoxNode]]], None] = None
+        # sides removed through remove_side_sbs()
+        self.__removed_sides: Set[Tuple[SwitchBoxSide, SwitchBoxIO]] = set()
 
         # used to identify different types of switches
         self.id = 0
@@ -264,20 +459,68 @@ class SwitchBox:
         self.registers: Dict[str, RegisterNode] = {}
         self.reg_muxs: Dict[str, RegisterMuxNode] = {}
 
+        # set when the tile is added to a graph
+        self.revision: Union[GraphRevision, None] = None
+
+    def attach(self, revision: GraphRevision):
+        self.revision = revision
+        nodes: List[Node] = list(self.registers.values())
+        nodes += self.reg_muxs.values()
+        if self.__sbs is not None:
+            nodes += self.get_all_sbs()
+        for node in nodes:
+            node.attach(revision)
+
     def __eq__(self, other):
         if not isinstance(other, SwitchBox):
             return False
-        if len(self.internal_wires) != len(other.internal_wires):
-            return False
-        # check bijection
-        for conn in self.internal_wires:
-            if conn not in other.internal_wires:
-                return False
-        return True
+        return self.get_fingerprint() == other.get_fingerprint()
+
+    def get_fingerprint(self) -> Tuple[int, frozenset]:
+        """canonical form of the internal wiring. Two switch boxes are
+        considered the same switch if their fingerprints are equal"""
+        return SwitchBoxHelper.get_fingerprint(self.internal_wires)
 
     def __repr__(self):
         return f"SWITCH {self.width} {self.id} {self.num_track}"
 
+    @property
+    def materialized(self) -> bool:
+        return self.__sbs is not None
+
+    def __get_sbs(self, connect: bool = True) \
+            -> List[List[List[SwitchBoxNode]]]:
+        if self.__sbs is not None:
+            return self.__sbs
+        # internal connections link nodes on every side together, so all the
+        # nodes are created at once
+        sbs = [[[None for _ in range(self.num_track)]
+                for _ in SwitchBoxIO] for _ in SwitchBoxSide]
+        for side in SwitchBoxSide:
+            for io in SwitchBoxIO:
+                if (side, io) in self.__removed_sides:
+                    sbs[side.value][io.value].clear()
+                    continue
+                for track in range(self.num_track):
+                    node = SwitchBoxNode(self.x, self.y, track, self.width,
+                                         side, io)
+                    if self.revision is not None:
+                        node.attach(self.revision)
+                    sbs[side.value][io.value][track] = node
+        self.__sbs = sbs
+        if not connect:
+            return sbs
+
+        # assign internal wiring
+        # the order is in -> out
+        for conn in self.internal_wires:
+            track_from, side_from, track_to, side_to = conn
+            sb_from = sbs[side_from.value][SwitchBoxIO.SB_IN.value][track_from]
+            sb_to = sbs[side_to.value][SwitchBoxIO.SB_OUT.value][track_to]
+            # internal sb connection has no delay
+            sb_from.add_edge(sb_to, 0)
+        return sbs
+
     def __getitem__(self, item: Tuple[SwitchBoxSide, int, SwitchBoxIO]):
         if not isinstance(item, tuple):
             raise ValueError("index has to be a tuple")
@@ -288,87 +531,131 @@ class SwitchBox:
         if not isinstance(item[-1], SwitchBoxIO):
             raise ValueError(item[-1])
         side, track, io = item
-        return self.__sbs[side.value][io.value][track]
+        return self.__get_sbs()[side.value][io.value][track]
 
     def get_all_sbs(self) -> List[SwitchBoxNode]:
+        sbs = self.__get_sbs()
+        # same order as iterating through the enums, without the cost of
+        # accessing enum values in the inner loop
+        groups = [sbs[side.value][io.value] for side in SwitchBoxSide
+                  for io in SwitchBoxIO]
         result = []
         for track in range(self.num_track):
-            for side in SwitchBoxSide:
-                for io in SwitchBoxIO:
-                    sb = self.get_sb(side, track, io)
-                    if sb is not None:
-                        result.append(sb)
+            for group in groups:
+                # we may have removed the nodes
+                if track < len(group):
+                    result.append(group[track])
         return result
 
+    def create_nodes(self) -> List[SwitchBoxNode]:
+        """same as get_all_sbs(), but nodes created by this call don't get
+        the internal connections. Used by callers that set the connections
+        of every node themselves"""
+        self.__get_sbs(connect=False)
+        return self.get_all_sbs()
+
+    def get_fan_out(self, side: SwitchBoxSide,
+                    track: int) -> Tuple[Tuple[int, SwitchBoxSide], ...]:
+        """returns the (track, side) of every SB_OUT the SB_IN at (side,
+        track) connects to internally. Does not create any node"""
+        index = SwitchBoxHelper.get_fan_out_index(self.internal_wires)
+        return index.get((side, track), ())
+
     def get_sb(self, side: SwitchBoxSide,
                track: int,
                io: SwitchBoxIO) -> Union[SwitchBoxNode, None]:
         # we may have removed the nodes
-        if track < len(self.__sbs[side.value][io.value]):
-            return self.__sbs[side.value][io.value][track]
+        sbs = self.__get_sbs()[side.value][io.value]
+        if track < len(sbs):
+            return sbs[track]
         else:
             return None
 
     def remove_side_sbs(self, side: SwitchBoxSide, io: SwitchBoxIO):
+        if self.revision is not None:
+            self.revision.nodes += 1
+            self.revision.wiring += 1
         # first remove the connections and nodes
-        for sb in self.__sbs[side.value][io.value]:
+        sbs = self.__get_sbs()
+        for sb in sbs[side.value][io.value]:
             # create a snapshot before removes them
             nodes_to_remove = list(sb)
             for node in nodes_to_remove:
                 sb.remove_edge(node)
-            for node in sb.get_conn_in():
+            for node in list(sb.get_conn_in()):
                 node.remove_edge(sb)
 
-        self.__sbs[side.value][io.value].clear()
-        # then remove the internal wires
-        wires_to_remove = set()
-        for conn in self.internal_wires:
-            _, side_from, _, side_to = conn
-            if io == SwitchBoxIO.SB_IN and side_from == side:
-                wires_to_remove.add(conn)
-            elif io == SwitchBoxIO.SB_OUT and side_to == side:
-                wires_to_remove.add(conn)
-        for conn in wires_to_remove:
-            self.internal_wires.remove(conn)
+        sbs[side.value][io.value].clear()
+        self.__removed_sides.add((side, io))
+        # then remove the internal wires. the wires may be shared with other
+        # switch boxes, so we get a new pattern instead
+        self.internal_wires = SwitchBoxHelper.remove_side(self.internal_wires,
+                                                          side, io)
 
     def add_pipeline_register(self, side: SwitchBoxSide, track: int):
         # find that specific sb node
         node = self.get_sb(side, track, SwitchBoxIO.SB_OUT)
         if node is None:
             return
-        neighbors = {}
-        for n in node:
+        neighbors = list(node)
+        for n in neighbors:
             if isinstance(n, RegisterNode) or isinstance(n, RegisterMuxNode):
                 raise Exception("pipeline register already inserted")
-            cost = node.get_edge_cost(n)
-            neighbors[n] = cost
-        # disconnect them first
-        for n in neighbors:
-            node.remove_edge(n)
         # create a register mux node and a register node
         reg = RegisterNode(f"T{track}_{side.name}", node.x, node.y, track,
                            node.width)
         reg_mux = RegisterMuxNode(node.x, node.y, track, node.width,
                                   side)
+        if self.revision is not None:
+            reg.attach(self.revision)
+            reg_mux.attach(self.revision)
         # connect node to them
         node.add_edge(reg)
         node.add_edge(reg_mux)
         # connect reg to the reg_mux
         reg.add_edge(reg_mux)
 
-        # add the connect back from the neighbors
-        for n, cost in neighbors.items():
-            reg_mux.add_edge(n, cost)
+        # the reg_mux takes the place of node in the neighbors, so that the
+        # mux select values of the neighbors don't change
+        for n in neighbors:
+            node.replace_edge(n, reg_mux)
 
         # last step: add to the tile level
         assert reg.name not in self.registers
         assert reg_mux.name not in self.reg_muxs
         self.registers[reg.name] = reg
         self.reg_muxs[reg_mux.name] = reg_mux
+        if self.revision is not None:
+            self.revision.nodes += 1
+
+    def has_pipeline_register(self, side: SwitchBoxSide, track: int) -> bool:
+        return f"T{track}_{side.name}" in self.registers and \
+            f"{side.value}_{track}" in self.reg_muxs
+
+    def remove_pipeline_register(self, side: SwitchBoxSide, track: int):
+        """removes a pipeline register inserted by add_pipeline_register()
+        and connects the switch box node to the neighbors directly again"""
+        if not self.has_pipeline_register(side, track):
+            raise Exception("pipeline register not inserted")
+        reg = self.registers.pop(f"T{track}_{side.name}")
+        reg_mux = self.reg_muxs.pop(f"{side.value}_{track}")
+        node = self.get_sb(side, track, SwitchBoxIO.SB_OUT)
+        # node takes the place of the reg_mux in the neighbors again, so the
+        # mux select values are the same as before the register was inserted
+        for n in list(reg_mux):
+            reg_mux.replace_edge(n, node)
+        # disconnect the register and the register mux
+        reg.remove_edge(reg_mux)
+        node.remove_edge(reg)
+        node.remove_edge(reg_mux)
+        if self.revision is not None:
+            self.revision.nodes += 1
 
     def clone(self):
         switchbox = SwitchBox(self.x, self.y, self.num_track, self.width,
                               self.internal_wires)
+        switchbox.id = self.id
+        switchbox.__removed_sides = self.__removed_sides.copy()
         # clone other regs and reg muxs
         for reg_name, reg_node in self.registers.items():
             switchbox.registers[reg_name] = RegisterNode(reg_node.name,
@@ -430,6 +717,9 @@ class Tile:
         # hold for the core
         self.core: InterconnectCore = None
 
+        # set when the tile is added to a graph
+        self.revision: Union[GraphRevision, None] = None
+
     def __eq__(self, other):
         if not isinstance(other, Tile):
             return False
@@ -440,11 +730,19 @@ class Tile:
         return f"TILE ({self.x}, {self.y}, {self.height}, " +\
                f"{self.switchbox.id})"
 
+    def attach(self, revision: GraphRevision):
+        self.revision = revision
+        self.switchbox.attach(revision)
+        for node in self.ports.values():
+            node.attach(revision)
+
     def set_core(self, core: InterconnectCore):
         self.inputs.clear()
         self.outputs.clear()
         self.ports.clear()
         self.core = core
+        if self.revision is not None:
+            self.revision.nodes += 1
 
         # this is to clear to core
         if core is None:
@@ -466,6 +764,9 @@ class Tile:
                 # create node
                 self.ports[port_name] = PortNode(port_name, self.x,
                                                  self.y, width)
+        if self.revision is not None:
+            for node in self.ports.values():
+                node.attach(self.revision)
 
     def core_has_input(self, port: str):
         return port in self.inputs
@@ -481,6 +782,16 @@ class Tile:
                io: SwitchBoxIO) -> Union[SwitchBoxNode, None]:
         return self.switchbox.get_sb(side, track, io)
 
+    def get_all_nodes(self) -> List[Node]:
+        """returns every node that belongs to the tile, ordered the same way
+        as the graph dump: switch box nodes, ports, registers and then
+        register muxes"""
+        result: List[Node] = self.switchbox.get_all_sbs()
+        result += self.ports.values()
+        result += self.switchbox.registers.values()
+        result += self.switchbox.reg_muxs.values()
+        return result
+
     def set_core_connection(self, port_name: str,
                             connection_type: List[SBConnectionType]):
         # make sure that it's an input port
@@ -506,8 +817,7 @@ class Tile:
 
     @staticmethod
     def create_tile(x: int, y: int, bit_width: int, num_tracks: int,
-                    internal_wires: List[Tuple[int, SwitchBoxSide,
-                                               int, SwitchBoxSide]],
+                    internal_wires: Sequence[SBWire],
                     height: int = 1) -> "Tile":
         switch = SwitchBox(x, y, num_tracks, bit_width, internal_wires)
         tile = Tile(x, y, bit_width, switch, height)
@@ -521,43 +831,106 @@ class Tile:
         tile.switchbox = switchbox
         # we don't clone the cores
         tile.set_core(self.core)
+        if self.core is None:
+            # tiles without a core, e.g. the ones loaded from a file, still
+            # have their ports
+            for port_name, node in self.ports.items():
+                tile.ports[port_name] = PortNode(port_name, node.x, node.y,
+                                                 node.width)
+            tile.inputs.update(self.inputs)
+            tile.outputs.update(self.outputs)
         return tile
 
 
 class InterconnectGraph:
-    def __init__(self, bit_width: int):
+    # enum lookups used by load_graph()
+    __SIDES = {side.value: side for side in SwitchBoxSide}
+    __IOS = {io.value: io for io in SwitchBoxIO}
+
+    def __init__(self, bit_width: int, width: int = 0, height: int = 0):
+        """width and height preallocate the tile grid, if the size of the
+        array is known up front. The grid still grows automatically when a
+        tile is placed outside of it"""
         self.__tiles: Dict[Tuple[int, int], Tile] = {}
         self.__switch_ids: Dict[int, SwitchBox] = {}
+        # switch box fingerprint -> switch id
+        self.__switch_fingerprints: Dict[Tuple[int, frozenset], int] = {}
 
         # this is a 2d grid  designed to support fast query with irregular
         # tile height.
         self.__tile_grid: List[List[Union[Tile, None]]] = []
+        # number of None entries in the grid
+        self.__num_empty = 0
+        self.__resize_grid(width, height)
 
         self.bit_width = bit_width
 
+        # node id and key lookup, rebuilt when nodes are added or removed
+        self.__revision = GraphRevision()
+        self.__registry: Union[NodeRegistry, None] = None
+        self.__registry_revision = -1
+        self.__wiring_revision = 0
+        # cached result of freeze()
+        self.__frozen: Union[FrozenGraph, None] = None
+        self.__frozen_revision: Tuple[int, int] = (-1, -1)
+        self.__reachability: Union[ReachabilityIndex, None] = None
+
     def add_tile(self, tile: Tile):
         tile.switchbox.id = self.__assign_id(tile.switchbox)
+        self.__place_tile(tile)
+
+    def add_tiles(self, tiles: Iterable[Tile]):
+        """adds the tiles in order. The tile grid is resized once for all of
+        them"""
+        tiles = list(tiles)
+        if not tiles:
+            return
+        width = max(tile.x for tile in tiles) + 1
+        height = max(tile.y + tile.height for tile in tiles)
+        self.__resize_grid(width, height)
+        for tile in tiles:
+            self.add_tile(tile)
+
+    def __place_tile(self, tile: Tile):
         x = tile.x
         y = tile.y
         self.__tiles[(x, y)] = tile
+        self.__attach_tile(tile)
 
-        # adjusting __tile_grid
-        height = tile.height
         # automatically scale the chip
-        while len(self.__tile_grid) < y + height:
-            self.__tile_grid.append([])
-        for row in range(len(self.__tile_grid)):
-            while len(self.__tile_grid[row]) <= x:
-                self.__tile_grid[row].append(None)
+        height = tile.height
+        self.__resize_grid(x + 1, y + height)
         # store indices and checking for correctness
         self.__assign_tile_grid(x, y, tile)
         for i in range(y + 1, y + height):
             # adding reference to that tile
             self.__assign_tile_grid(x, i, tile)
 
+    def __resize_grid(self, width: int, height: int):
+        """makes sure the grid is at least width x height. Every row has the
+        same length"""
+        grid = self.__tile_grid
+        current_width = len(grid[0]) if grid else 0
+        if width > current_width:
+            padding = [None] * (width - current_width)
+            for row in grid:
+                row.extend(padding)
+            self.__num_empty += len(padding) * len(grid)
+        else:
+            width = current_width
+        num_rows = height - len(grid)
+        if num_rows > 0:
+            grid.extend([None] * width for _ in range(num_rows))
+            self.__num_empty += width * num_rows
+
+    def __attach_tile(self, tile: Tile):
+        tile.attach(self.__revision)
+        self.__revision.nodes += 1
+
     def __assign_tile_grid(self, x: int, y: int, tile: Tile) -> None:
         self.__check_grid(x, y)
         self.__tile_grid[y][x] = tile
+        self.__num_empty -= 1
 
     def __check_grid(self, x: int, y: int) -> None:
         if self.__tile_grid[y][x] is not None:
@@ -565,13 +938,27 @@ class InterconnectGraph:
             raise RuntimeError(f"{str(tile)} already exists")
 
     def __assign_id(self, switch: SwitchBox) -> int:
-        for switch_id, s in self.__switch_ids.items():
-            if switch == s:
-                return switch_id
+        if self.__wiring_revision != self.__revision.wiring:
+            # some registered switch boxes have been modified
+            self.__index_switch_ids()
+        fingerprint = switch.get_fingerprint()
+        switch_id = self.__switch_fingerprints.get(fingerprint)
+        if switch_id is not None:
+            return switch_id
         switch_id = len(self.__switch_ids)
         self.__switch_ids[switch_id] = switch
+        self.__switch_fingerprints[fingerprint] = switch_id
         return switch_id
 
+    def __index_switch_ids(self):
+        self.__switch_fingerprints.clear()
+        for switch_id, switch in self.__switch_ids.items():
+            fingerprint = switch.get_fingerprint()
+            # first match wins
+            if fingerprint not in self.__switch_fingerprints:
+                self.__switch_fingerprints[fingerprint] = switch_id
+        self.__wiring_revision = self.__revision.wiring
+
     def get_tile(self, x: int, y: int) -> Union[Tile, None]:
         width, height = self.get_size()
         if x >= width or y >= height:
@@ -580,11 +967,7 @@ class InterconnectGraph:
         return result
 
     def has_empty_tile(self) -> bool:
-        for y in range(len(self.__tile_grid)):
-            for x in range(len(self.__tile_grid[y])):
-                if self.__tile_grid[y][x] is None:
-                    return True
-        return False
+        return self.__num_empty > 0
 
     def is_original_tile(self, x: int, y: int):
         tile = self.get_tile(x, y)
@@ -623,9 +1006,75 @@ class InterconnectGraph:
         tile = self.get_tile(x, y)
         tile.set_core(core)
 
+    def add_pipeline_registers(self,
+                               spec: Union[
+                                   Iterable[Tuple[int, SwitchBoxSide]],
+                                   Dict[Tuple[int, int],
+                                        Iterable[Tuple[int, SwitchBoxSide]]]]):
+        """inserts pipeline registers into many tiles at once.
+
+        spec is either a list of (track, side) pairs, which is applied to
+        every tile that has the track, or a dict that maps the tile
+        coordinate to the (track, side) pairs of that tile. Registers are
+        inserted in the order of spec, same as calling
+        SwitchBox.add_pipeline_register() for every tile. The whole spec is
+        checked before the graph is changed, so an invalid spec leaves the
+        graph as it is
+        """
+        registers = self.__get_pipeline_registers(spec)
+        for switchbox, track, side in registers:
+            if switchbox.has_pipeline_register(side, track):
+                raise Exception("pipeline register already inserted")
+        for switchbox, track, side in registers:
+            switchbox.add_pipeline_register(side, track)
+
+    def remove_pipeline_registers(self,
+                                  spec: Union[
+                                      Iterable[Tuple[int, SwitchBoxSide]],
+                                      Dict[Tuple[int, int],
+                                           Iterable[Tuple[int,
+                                                          SwitchBoxSide]]]]):
+        """removes the pipeline registers described by spec, which has the
+        same format as in add_pipeline_registers(). Together they allow to
+        swap the register configuration without rebuilding the graph. As in
+        add_pipeline_registers(), nothing is removed if spec is invalid"""
+        registers = self.__get_pipeline_registers(spec)
+        for switchbox, track, side in registers:
+            if not switchbox.has_pipeline_register(side, track):
+                raise Exception("pipeline register not inserted")
+        for switchbox, track, side in registers:
+            switchbox.remove_pipeline_register(side, track)
+
+    def __get_pipeline_registers(self, spec) \
+            -> List[Tuple[SwitchBox, int, SwitchBoxSide]]:
+        result = []
+        if isinstance(spec, dict):
+            for coord, registers in spec.items():
+                if coord not in self.__tiles:
+                    raise ValueError(f"no tile at {coord}")
+                switchbox = self.__tiles[coord].switchbox
+                for track, side in registers:
+                    result.append((switchbox, track, side))
+        else:
+            switchboxes = []
+            for tile in self.__tiles.values():
+                if tile.switchbox is None or tile.switchbox.num_track == 0:
+                    continue
+                switchboxes.append(tile.switchbox)
+            for track, side in spec:
+                for switchbox in switchboxes:
+                    if track < switchbox.num_track:
+                        result.append((switchbox, track, side))
+        # the same register twice is as invalid as a register that is
+        # already there
+        if len({(id(s), t, d) for s, t, d in result}) != len(result):
+            raise ValueError("duplicated pipeline register")
+        return result
+
     def remove_tile(self, coord: Tuple[int, int]):
         if coord in self.__tiles:
             self.__tiles.pop(coord)
+            self.__revision.nodes += 1
 
     def get_sb(self, x: int, y: int, side: SwitchBoxSide, track: int,
                io: SwitchBoxIO):
@@ -649,6 +1098,8 @@ class InterconnectGraph:
             x, y = item.x, item.y
             tile = self.get_tile(x, y)
             return tile == item
+        elif isinstance(item, Node):
+            return self.find_node(item.key()) is item
         x = item.x
         y = item.y
         tile = self.get_tile(x, y)
@@ -656,60 +1107,412 @@ class InterconnectGraph:
             return False
         if isinstance(item, SwitchBox):
             return tile.switchbox == item
-        elif isinstance(item, PortNode):
-            return tile.ports[item.name] == item
-        elif isinstance(item, RegisterNode):
-            return tile.switchbox.registers[item.name] == item
-        elif isinstance(item, SwitchBoxNode):
-            return tile.get_sb(item.side, item.track, item.io) == item
         return False
 
+    def get_node_registry(self) -> "NodeRegistry":
+        if self.__registry is None or \
+                self.__registry_revision != self.__revision.nodes:
+            self.__registry = NodeRegistry(self.__tiles.values())
+            self.__registry_revision = self.__revision.nodes
+        return self.__registry
+
+    def get_node_id(self, node: Node) -> int:
+        """dense id of the node. ids are stable as long as no node is added
+        or removed"""
+        return self.get_node_registry().get_id(node)
+
+    def find_node(self, key: NodeKey) -> Union[Node, None]:
+        """looks the node up through the tile at the key's coordinates, so
+        it doesn't need an up-to-date registry"""
+        tile = self.__tiles.get((key.x, key.y))
+        if tile is None:
+            return None
+        if key.kind == NodeType.SwitchBox:
+            node = tile.get_sb(key.side, key.track, key.io)
+        elif key.kind == NodeType.Port:
+            node = tile.ports.get(key.name)
+        elif key.kind == NodeType.Register:
+            node = tile.switchbox.registers.get(key.name)
+        elif key.kind == NodeType.RegisterMux:
+            node = tile.switchbox.reg_muxs.get(key.name)
+        else:
+            return None
+        if node is None or node.key() != key:
+            return None
+        return node
+
     def dump_graph(self, filename: str):
         with open(filename, "w+") as f:
-            padding = "  "
-            begin = "BEGIN"
-            end = "END"
-
-            def write_line(value):
-                f.write(value + "\n")
-
-            def write_conn(node_):
-                if len(node_) == 0:
+            for chunk in self.__get_graph_chunks():
+                f.write(chunk)
+
+    def __get_graph_chunks(self, chunk_size: int = 1 << 14) -> Iterator[str]:
+        """produces the content of dump_graph() in chunks of about
+        chunk_size lines. The string of a node is only formatted once, no
+        matter how many connections it has"""
+        padding = "  "
+        conn_padding = padding * 3
+        begin = "BEGIN\n"
+        end = "END\n"
+        lines: List[str] = []
+        append = lines.append
+        # id(node) -> node_str(). nodes are alive during the dump, and id()
+        # is a lot cheaper than Node.__hash__()
+        node_strs: Dict[int, str] = {}
+
+        for _, switch in self.__switch_ids.items():
+            append(str(switch) + "\n")
+            append(begin)
+            for conn in switch.internal_wires:
+                track_from, side_from, track_to, side_to = conn
+                append(f"{padding}{track_from} {side_from.value} "
+                       f"{track_to} {side_to.value}\n")
+            append(end)
+        for _, tile in self.__tiles.items():
+            append(str(tile) + "\n")
+            for node in tile.get_all_nodes():
+                if len(node) == 0:
                     # don't output if it doesn't have any connections
-                    return
-                # TODO: need to test if it is deterministic
-                write_line(padding + node_.node_str())
-                write_line(padding + begin)
-                for n in node_:
-                    if isinstance(node_, SwitchBoxNode) and \
-                            isinstance(n, SwitchBoxNode):
-                        if node_.x == n.x and node_.y == n.y:
+                    continue
+                node_str = node_strs.get(id(node))
+                if node_str is None:
+                    node_str = node_strs[id(node)] = node.node_str()
+                append(f"{padding}{node_str}\n")
+                append(padding + begin)
+                is_sb = isinstance(node, SwitchBoxNode)
+                for n in node:
+                    if is_sb and isinstance(n, SwitchBoxNode):
+                        if node.x == n.x and node.y == n.y:
                             # this is internal connection so we skip
                             continue
-                    write_line(padding * 3 + n.node_str())
-                write_line(padding + end)
-
-            for _, switch in self.__switch_ids.items():
-                write_line(str(switch))
-                write_line(begin)
-                for conn in switch.internal_wires:
-                    track_from, side_from, track_to, side_to = conn
-                    write_line(padding + " ".join([str(track_from),
-                                                  str(side_from.value),
-                                                  str(track_to),
-                                                  str(side_to.value)]))
-                write_line(end)
-            for _, tile in self.__tiles.items():
-                write_line(str(tile))
-                sbs = tile.switchbox.get_all_sbs()
-                for sb in sbs:
-                    write_conn(sb)
-                for _, node in tile.ports.items():
-                    write_conn(node)
-                for _, reg in tile.switchbox.registers.items():
-                    write_conn(reg)
-                for _, reg_mux in tile.switchbox.reg_muxs.items():
-                    write_conn(reg_mux)
+                    node_str = node_strs.get(id(n))
+                    if node_str is None:
+                        node_str = node_strs[id(n)] = n.node_str()
+                    append(f"{conn_padding}{node_str}\n")
+                append(padding + end)
+            if len(lines) >= chunk_size:
+                yield "".join(lines)
+                lines.clear()
+        yield "".join(lines)
+
+    def dump_binary(self, filename: str):
+        """writes the graph in the binary format read by MappedGraph. The
+        node ids are the same as the ones of freeze()"""
+        MappedGraph.write(filename, self.bit_width, self.__binary_sections())
+
+    def dump_bytes(self) -> bytes:
+        """same as dump_binary(), but returns the content of the file"""
+        return MappedGraph.to_bytes(self.bit_width, self.__binary_sections())
+
+    def __binary_sections(self) -> Dict[str, Union[array, bytearray]]:
+        frozen = self.freeze()
+        name_offsets = array("i", [0])
+        name_data = bytearray()
+        for name in frozen.names:
+            name_data += name.encode()
+            name_offsets.append(len(name_data))
+        tiles = array("i")
+        for tile in self.__tiles.values():
+            tiles.extend((tile.x, tile.y, tile.height, tile.switchbox.id))
+        switches = array("i")
+        wires = array("i")
+        for switch_id, switch in self.__switch_ids.items():
+            switches.extend((switch_id, switch.num_track, len(wires) // 4))
+            for track_from, side_from, track_to, side_to in \
+                    switch.internal_wires:
+                wires.extend((track_from, side_from.value, track_to,
+                              side_to.value))
+        sections = {"kinds": frozen.kinds, "xs": frozen.xs, "ys": frozen.ys,
+                    "widths": frozen.widths, "tracks": frozen.tracks,
+                    "sides": frozen.sides, "ios": frozen.ios,
+                    "name_offsets": name_offsets, "name_data": name_data,
+                    "offsets": frozen.offsets, "targets": frozen.targets,
+                    "edge_delays": frozen.edge_delays,
+                    "rev_offsets": frozen.rev_offsets,
+                    "rev_sources": frozen.rev_sources,
+                    "tiles": tiles, "switches": switches, "wires": wires}
+        return sections
+
+    @staticmethod
+    def load_binary(filename: str,
+                    core_fn: Callable[[int, int], InterconnectCore] = None) \
+            -> "InterconnectGraph":
+        """reads a graph written by dump_binary(). Unlike load_graph(), edge
+        delays, the order of mux inputs and removed switch box sides are
+        restored, so the result is the same graph.
+
+        If core_fn is provided, it returns the core of the tile at (x, y),
+        which is set before the connections are loaded. The core has to have
+        the same ports as the one of the dumped graph. Tiles without a core
+        get their ports from the nodes in the file instead; ports that drive
+        other nodes are outputs of the core.
+        """
+        with MappedGraph(filename) as mapped:
+            return InterconnectGraph.__load_mapped(mapped, core_fn)
+
+    @staticmethod
+    def load_bytes(data: bytes,
+                   core_fn: Callable[[int, int], InterconnectCore] = None) \
+            -> "InterconnectGraph":
+        """reads a graph returned by dump_bytes(). See load_binary()"""
+        with MappedGraph(data) as mapped:
+            return InterconnectGraph.__load_mapped(mapped, core_fn)
+
+    def __reduce__(self):
+        # pickling the nodes directly recurses through the connections, which
+        # exceeds the recursion limit on large graphs. the graph is pickled
+        # in the binary format instead, together with the signatures of the
+        # cores, since the cores themselves usually can't be pickled
+        cores = {coord: CoreSignature(tile.core)
+                 for coord, tile in self.__tiles.items()
+                 if tile.core is not None}
+        return _load_pickled_graph, (self.dump_bytes(), cores)
+
+    @staticmethod
+    def __load_mapped(mapped: "MappedGraph",
+                      core_fn: Callable[[int, int], InterconnectCore]) \
+            -> "InterconnectGraph":
+        graph = InterconnectGraph(mapped.bit_width)
+        for switch_id, (num_track, internal_wires) in \
+                mapped.get_switches().items():
+            switch = SwitchBox(0, 0, num_track, mapped.bit_width,
+                               internal_wires)
+            switch.id = switch_id
+            graph.__switch_ids[switch_id] = switch
+        graph.__index_switch_ids()
+
+        # switch box sides that still have nodes, and the nodes of every
+        # tile
+        sb_sides = set()
+        switch_box = NodeType.SwitchBox.value
+        tile_nodes: Dict[Tuple[int, int], List[int]] = {}
+        kinds = mapped.kinds.tolist()
+        sides, ios = mapped.sides.tolist(), mapped.ios.tolist()
+        for node_id, coord in enumerate(zip(mapped.xs.tolist(),
+                                            mapped.ys.tolist())):
+            if kinds[node_id] == switch_box:
+                sb_sides.add((coord, sides[node_id], ios[node_id]))
+            node_ids = tile_nodes.get(coord)
+            if node_ids is None:
+                tile_nodes[coord] = [node_id]
+            else:
+                node_ids.append(node_id)
+
+        tiles = list(mapped.get_tiles())
+        if tiles:
+            graph.__resize_grid(max(x for x, _, _, _ in tiles) + 1,
+                                max(y + h for _, y, h, _ in tiles))
+        for x, y, height, switch_id in tiles:
+            template = graph.__switch_ids[switch_id]
+            tile = Tile.create_tile(x, y, graph.bit_width,
+                                    template.num_track,
+                                    template.internal_wires, height)
+            switchbox = tile.switchbox
+            switchbox.id = switch_id
+            if switchbox.num_track > 0:
+                for side in SwitchBoxSide:
+                    for io in SwitchBoxIO:
+                        if ((x, y), side.value, io.value) not in sb_sides:
+                            switchbox.remove_side_sbs(side, io)
+            if core_fn is not None:
+                tile.set_core(core_fn(x, y))
+            for node_id in tile_nodes.get((x, y), []):
+                if kinds[node_id] != switch_box:
+                    graph.__load_tile_node(mapped, node_id, tile,
+                                           tile.core is None)
+            graph.__place_tile(tile)
+            # the connections, including the internal ones, come from the
+            # file
+            switchbox.create_nodes()
+
+        # map the ids to nodes. the file lists the nodes of a tile in the
+        # same order as get_all_nodes(); otherwise they are looked up one by
+        # one
+        nodes: List[Union[Node, None]] = [None] * len(mapped)
+        for coord, node_ids in tile_nodes.items():
+            tile = graph.__tiles.get(coord)
+            if tile is None:
+                continue
+            tile_nodes_ = tile.get_all_nodes()
+            if len(tile_nodes_) == len(node_ids) and \
+                    all(node.TYPE.value == kinds[node_id]
+                        for node_id, node in zip(node_ids, tile_nodes_)):
+                for node_id, node in zip(node_ids, tile_nodes_):
+                    nodes[node_id] = node
+        for node_id, node in enumerate(nodes):
+            if node is None:
+                key = mapped.get_node(node_id).key()
+                node = graph.find_node(key)
+                if node is None:
+                    raise ValueError(f"unable to load {key}")
+                nodes[node_id] = node
+
+        # every node gets its connections from the file right away, so that
+        # the file can be closed
+        offsets, targets = mapped.offsets.tolist(), mapped.targets.tolist()
+        delays = mapped.edge_delays.tolist()
+        rev_offsets = mapped.rev_offsets.tolist()
+        rev_sources = mapped.rev_sources.tolist()
+        for node_id, node in enumerate(nodes):
+            start, end = offsets[node_id], offsets[node_id + 1]
+            neighbors = dict(zip([nodes[n] for n in targets[start:end]],
+                                 delays[start:end]))
+            start, end = rev_offsets[node_id], rev_offsets[node_id + 1]
+            node.set_connections(neighbors, [nodes[n] for n in
+                                             rev_sources[start:end]])
+        return graph
+
+    @staticmethod
+    def __load_tile_node(mapped: "MappedGraph", node_id: int, tile: Tile,
+                         create_port: bool):
+        kind = mapped.kinds[node_id]
+        if kind == NodeType.Port.value:
+            if not create_port:
+                return
+            node = mapped.get_node(node_id)
+            tile.ports[node.name] = node
+            if mapped.fan_out(node_id) > 0:
+                tile.outputs.add(node.name)
+            else:
+                tile.inputs.add(node.name)
+        elif kind == NodeType.Register.value:
+            node = mapped.get_node(node_id)
+            tile.switchbox.registers[node.name] = node
+        elif kind == NodeType.RegisterMux.value:
+            node = mapped.get_node(node_id)
+            tile.switchbox.reg_muxs[node.name] = node
+
+    @staticmethod
+    def load_graph(filename: str) -> "InterconnectGraph":
+        """reads a graph written by dump_graph(). The file is streamed twice:
+        the first pass creates the switches and tiles, the second one the
+        nodes and connections, so that connections to tiles further down in
+        the file can be made right away.
+
+        The format does not store edge delays, the order of mux inputs or
+        removed switch box sides. Connections are added with no delay and
+        mux inputs follow the order in which connections appear in the file.
+        Tiles have no core; ports are created from the connections.
+        """
+        graph = None
+        with open(filename) as f:
+            switch: Union[SwitchBox, None] = None
+            for line in f:
+                if switch is not None:
+                    # inside a SWITCH block
+                    if line.startswith(" "):
+                        track_from, side_from, track_to, side_to = \
+                            line.split()
+                        switch.internal_wires.append(
+                            (int(track_from), SwitchBoxSide(int(side_from)),
+                             int(track_to), SwitchBoxSide(int(side_to))))
+                    elif line.startswith("END"):
+                        switch.internal_wires = tuple(switch.internal_wires)
+                        switch = None
+                elif line.startswith("SWITCH"):
+                    _, width, switch_id, num_track = line.split()
+                    if graph is None:
+                        graph = InterconnectGraph(int(width))
+                    switch = SwitchBox(0, 0, int(num_track), int(width), [])
+                    switch.id = int(switch_id)
+                    graph.__switch_ids[switch.id] = switch
+                elif line.startswith("TILE"):
+                    if graph is None:
+                        raise ValueError(f"{filename}: tile before switch")
+                    x, y, height, switch_id = graph.__parse_values(line)
+                    template = graph.__switch_ids[switch_id]
+                    tile = Tile.create_tile(x, y, graph.bit_width,
+                                            template.num_track,
+                                            template.internal_wires, height)
+                    tile.switchbox.id = switch_id
+                    graph.__place_tile(tile)
+        if graph is None:
+            raise ValueError(f"{filename} does not contain any switch")
+        graph.__index_switch_ids()
+
+        # node string -> node
+        nodes: Dict[str, Node] = {}
+        with open(filename) as f:
+            in_switch = False
+            node = None
+            for line in f:
+                if line.startswith("      "):
+                    # connection of the current node
+                    key = line.strip()
+                    target = nodes.get(key)
+                    if target is None:
+                        target = nodes[key] = graph.__load_node(key, False)
+                    node.add_edge(target)
+                elif line.startswith("  "):
+                    if in_switch:
+                        continue
+                    key = line.strip()
+                    if key == "BEGIN" or key == "END":
+                        continue
+                    node = graph.__load_node(key, True)
+                    nodes[key] = node
+                elif line.startswith("SWITCH"):
+                    in_switch = True
+                elif line.startswith("TILE"):
+                    in_switch = False
+        return graph
+
+    @staticmethod
+    def __parse_values(line: str) -> List[int]:
+        # "TYPE (1, 2, 3)" -> [1, 2, 3]
+        values = line[line.index("(") + 1:line.rindex(")")]
+        return [int(value) for value in values.split(",")]
+
+    def __load_node(self, node_str: str, is_source: bool) -> Node:
+        """finds or creates the node printed by Node.node_str()"""
+        kind, _ = node_str.split(" ", 1)
+        values = self.__parse_values(node_str)
+        if kind == "SB":
+            track, x, y, side, io, _ = values
+            node = self.__get_tile(x, y).get_sb(self.__SIDES[side], track,
+                                                self.__IOS[io])
+            if node is None:
+                raise ValueError(f"{node_str} does not exist")
+            return node
+        if kind == "RMUX":
+            track, x, y, side, width = values
+            switchbox = self.__get_tile(x, y).switchbox
+            node = RegisterMuxNode(x, y, track, width, SwitchBoxSide(side))
+            registry = switchbox.reg_muxs
+        elif kind == "REG":
+            track, x, y, width = values
+            name = node_str.split(" ")[1]
+            switchbox = self.__get_tile(x, y).switchbox
+            node = RegisterNode(name, x, y, track, width)
+            registry = switchbox.registers
+        elif kind == "PORT":
+            x, y, width = values
+            name = node_str.split(" ")[1]
+            tile = self.__get_tile(x, y)
+            node = PortNode(name, x, y, width)
+            # ports that drive other nodes are outputs of the core
+            if is_source:
+                tile.outputs.add(name)
+            else:
+                tile.inputs.add(name)
+            registry = tile.ports
+        else:
+            raise ValueError(f"unknown node {node_str}")
+        if node.name in registry:
+            # move it to the end, so that the nodes are in the same order
+            # as in the file
+            node = registry.pop(node.name)
+        else:
+            node.attach(self.__revision)
+            self.__revision.nodes += 1
+        registry[node.name] = node
+        return node
+
+    def __get_tile(self, x: int, y: int) -> Tile:
+        tile = self.__tiles.get((x, y))
+        if tile is None:
+            raise ValueError(f"tile ({x}, {y}) does not exist")
+        return tile
 
     def connect_switchbox(self, x0: int, y0: int, x1: int, y1: int,
                           expected_length: int, track: int,
@@ -729,6 +1532,38 @@ class InterconnectGraph:
                     the expected_length. it is safe but may leave some tiles
                     unconnected
         """
+        self.__check_region(x0, y0, x1, y1, expected_length)
+        pairs = self.__get_sb_pairs(x0, y0, x1, y1, expected_length, policy)
+        for tile_from, tile_to, side in pairs:
+            assert tile_from in self
+            assert tile_to in self
+        self.__add_sb_connections(pairs, track)
+
+    def connect_switchboxes(self, x0: int, y0: int, x1: int, y1: int,
+                            track_info: Dict[int, int],
+                            policy: InterconnectPolicy):
+        """bulk version of connect_switchbox() that connects every track in
+        the region (x0, y0) <-> (x1, y1) at once. track_info maps the wire
+        length to the number of tracks, e.g. {1: 4, 2: 1}. tracks are
+        assigned in ascending order of the wire length, starting from track
+        0. The result is identical to calling connect_switchbox() for each
+        track in that order. Since the connected tile pairs only depend on
+        the wire length, they are computed once per length instead of once
+        per track"""
+        track_lens = sorted(track_info.keys())
+        # check every length before making any connection
+        for track_len in track_lens:
+            self.__check_region(x0, y0, x1, y1, track_len)
+        current_track = 0
+        for track_len in track_lens:
+            pairs = self.__get_sb_pairs(x0, y0, x1, y1, track_len, policy)
+            for _ in range(track_info[track_len]):
+                self.__add_sb_connections(pairs, current_track)
+                current_track += 1
+
+    @staticmethod
+    def __check_region(x0: int, y0: int, x1: int, y1: int,
+                       expected_length: int):
         if x1 - expected_length < x0 or y1 - expected_length < y0:
             raise ValueError("the region has to be bigger than expected "
                              "length")
@@ -740,6 +1575,14 @@ class InterconnectGraph:
             raise ValueError("the region y has to be divisible by expected_"
                              "length")
 
+    def __get_sb_pairs(self, x0: int, y0: int, x1: int, y1: int,
+                       expected_length: int,
+                       policy: InterconnectPolicy) \
+            -> List[Tuple[Tile, Tile, SwitchBoxSide]]:
+        """computes the (tile_from, tile_to, side) pairs to connect, in the
+        order they are connected. The backward connection from tile_to to
+        tile_from is implied"""
+        result = []
         # Note (keyi):
         # this code is very complex and hence has many comments. please do not
         # simplify this code unless you fully understand the logic flow.
@@ -776,13 +1619,7 @@ class InterconnectGraph:
 
                 assert tile_to.y == tile_from.y
                 # add to connection list
-                # forward
-                self.__add_sb_connection(tile_from, tile_to, track,
-                                         SwitchBoxSide.EAST)
-
-                # backward
-                self.__add_sb_connection(tile_to, tile_from, track,
-                                         SwitchBoxSide.WEST)
+                result.append((tile_from, tile_to, SwitchBoxSide.EAST))
 
         # top to bottom this is very similar to the previous one (left to
         # right)
@@ -812,35 +1649,59 @@ class InterconnectGraph:
 
                 assert tile_to.x == tile_from.x
                 # add to connection list
-                # forward
-                self.__add_sb_connection(tile_from, tile_to, track,
-                                         SwitchBoxSide.SOUTH)
-                # backward
-                self.__add_sb_connection(tile_to, tile_from, track,
-                                         SwitchBoxSide.NORTH)
-
-    def __add_sb_connection(self, tile_from: Tile,
-                            tile_to: Tile, track: int,
-                            side: SwitchBoxSide):
-        assert tile_from in self
-        assert tile_to in self
+                result.append((tile_from, tile_to, SwitchBoxSide.SOUTH))
+        return result
+
+    @staticmethod
+    def __add_sb_connections(pairs: List[Tuple[Tile, Tile, SwitchBoxSide]],
+                             track: int):
         # connect the underlying routing graph
-        sb_from = tile_from.get_sb(side, track, SwitchBoxIO.SB_OUT)
-        sb_to = tile_to.get_sb(SwitchBoxSide.get_opposite_side(side),
-                               track, SwitchBoxIO.SB_IN)
-        assert sb_from is not None and sb_to is not None
-        sb_from.add_edge(sb_to)
+        for tile_from, tile_to, side in pairs:
+            opposite_side = side.get_opposite_side()
+            # forward
+            sb_from = tile_from.get_sb(side, track, SwitchBoxIO.SB_OUT)
+            sb_to = tile_to.get_sb(opposite_side, track, SwitchBoxIO.SB_IN)
+            assert sb_from is not None and sb_to is not None
+            sb_from.add_edge(sb_to)
+            # backward
+            sb_from = tile_to.get_sb(opposite_side, track, SwitchBoxIO.SB_OUT)
+            sb_to = tile_from.get_sb(side, track, SwitchBoxIO.SB_IN)
+            assert sb_from is not None and sb_to is not None
+            sb_from.add_edge(sb_to)
 
     def clone(self):
-        # clone the graph
-        # tiles first
+        """deep copy of the graph, including edge delays, the order of mux
+        inputs, switch ids and removed switch box sides. Changes made to
+        either graph afterwards are not visible to the other one. Switch
+        boxes that haven't created their nodes yet are cloned as they are"""
         graph = InterconnectGraph(self.bit_width)
+        # (node, node of the clone)
+        pairs: List[Tuple[Node, Node]] = []
+        # tiles first
         for (x, y), tile in self.__tiles.items():
-            graph.__tiles[(x, y)] = tile.clone()
+            new_tile = tile.clone()
+            graph.__tiles[(x, y)] = new_tile
+            graph.__attach_tile(new_tile)
+            switchbox = tile.switchbox
+            new_switchbox = new_tile.switchbox
+            if switchbox.materialized:
+                # the internal connections are copied below
+                pairs += zip(switchbox.get_all_sbs(),
+                             new_switchbox.create_nodes())
+            for name, node in tile.ports.items():
+                pairs.append((node, new_tile.ports[name]))
+            for name, node in switchbox.registers.items():
+                pairs.append((node, new_switchbox.registers[name]))
+            for name, node in switchbox.reg_muxs.items():
+                pairs.append((node, new_switchbox.reg_muxs[name]))
+        # then the connections, node by node
+        nodes = {id(node): new_node for node, new_node in pairs}
+        for node, new_node in pairs:
+            new_node.copy_connections(node, nodes)
         # clone the switch id list
-        # notice that we are very slopy with the switch id
-        # since the equality check will make it working
-        graph.__switch_ids = self.__switch_ids.copy()
+        for switch_id, switch in self.__switch_ids.items():
+            graph.__switch_ids[switch_id] = switch.clone()
+        graph.__index_switch_ids()
         # clone the tile grid
         for row in self.__tile_grid:
             new_row = []
@@ -850,55 +1711,631 @@ class InterconnectGraph:
                 else:
                     new_row.append(graph.__tiles[(entry.x, entry.y)])
             graph.__tile_grid.append(new_row)
-
-        # now clone the connections
-        for _, tile in self.__tiles.items():
-            for sb_node in tile.switchbox.get_all_sbs():
-                new_sb_node = self.locate_node(graph, sb_node)
-                for node in sb_node:
-                    new_node = self.locate_node(graph, node)
-                    new_sb_node.add_edge(new_node, sb_node.get_edge_cost(node))
-            for _, reg_node in tile.switchbox.registers.items():
-                new_reg_node = self.locate_node(graph, reg_node)
-                for node in reg_node:
-                    new_node = self.locate_node(graph, node)
-                    new_reg_node.add_edge(new_node,
-                                          reg_node.get_edge_cost(node))
-            for _, port_node in tile.ports.items():
-                new_port_node = self.locate_node(graph, port_node)
-                for node in port_node:
-                    new_node = self.locate_node(graph, node)
-                    new_port_node.add_edge(new_node,
-                                           new_port_node.get_edge_cost(node))
-            for _, reg_mux in tile.switchbox.reg_muxs.items():
-                new_reg_mux = self.locate_node(graph, reg_mux)
-                for node in reg_mux:
-                    new_node = self.locate_node(graph, node)
-                    new_reg_mux.add_edge(new_node,
-                                         new_reg_mux.get_edge_cost(node))
+        graph.__num_empty = self.__num_empty
         return graph
 
     @staticmethod
     def locate_node(graph: "InterconnectGraph", node: Node):
-        x, y = node.x, node.y
-        tile = graph.__tiles[(x, y)]
-        if isinstance(node, SwitchBoxNode):
-            return tile.get_sb(node.side, node.track, node.io)
-        elif isinstance(node, PortNode):
-            return tile.ports[node.name]
-        elif isinstance(node, RegisterNode):
-            return tile.switchbox.registers[node.name]
-        else:
-            assert isinstance(node, RegisterMuxNode)
-            return tile.switchbox.reg_muxs[node.name]
+        return graph.find_node(node.key())
 
     def __iter__(self):
         return iter(self.__tiles)
 
+    def freeze(self) -> "FrozenGraph":
+        """creates an immutable compressed-sparse-row (CSR) snapshot of the
+        graph. Nodes are numbered densely in tile order, using the same node
+        order as the graph dump. The snapshot is cached until nodes or
+        connections of the graph change"""
+        revision = (self.__revision.nodes, self.__revision.edges)
+        if self.__frozen is None or self.__frozen_revision != revision:
+            self.__frozen = FrozenGraph(self.bit_width,
+                                        self.get_node_registry().nodes)
+            self.__frozen_revision = revision
+        return self.__frozen
+
+    def get_reachability(self) -> "ReachabilityIndex":
+        """reachability index of the graph. The index is built on the first
+        call and rebuilt together with freeze()"""
+        frozen = self.freeze()
+        if self.__reachability is None or \
+                self.__reachability.frozen is not frozen:
+            self.__reachability = ReachabilityIndex(frozen)
+        return self.__reachability
+
+    def is_reachable(self, src: Node, dst: PortNode) -> bool:
+        return self.get_reachability().is_reachable(src, dst)
+
+    def get_stats(self) -> "GraphStats":
+        return GraphStats.create(self.freeze())
+
+
+def _load_pickled_graph(data: bytes,
+                        cores: Dict[Tuple[int, int], InterconnectCore]) \
+        -> InterconnectGraph:
+    return InterconnectGraph.load_bytes(data, lambda x, y: cores.get((x, y)))
+
+
+class NodeRegistry:
+    """Assigns a dense id to every node of a graph, in tile order and then
+    in the order of Tile.get_all_nodes(), and indexes the nodes by their
+    canonical key. Use InterconnectGraph.get_node_registry() to obtain an
+    up-to-date registry"""
+    def __init__(self, tiles: Iterable[Tile]):
+        self.nodes: List[Node] = []
+        for tile in tiles:
+            self.nodes += tile.get_all_nodes()
+        self.__ids: Dict[Node, int] = {}
+        self.__keys: Dict[NodeKey, int] = {}
+        for node_id, node in enumerate(self.nodes):
+            self.__ids[node] = node_id
+            self.__keys[node.key()] = node_id
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get_id(self, node: Node) -> int:
+        return self.__ids[node]
+
+    def get_node(self, node_id: int) -> Node:
+        return self.nodes[node_id]
+
+    def find(self, key: NodeKey) -> Union[Node, None]:
+        node_id = self.__keys.get(key)
+        if node_id is None:
+            return None
+        return self.nodes[node_id]
+
+
+class FrozenGraph:
+    """Read-only view of an InterconnectGraph where every node is identified
+    by a dense integer id. Node attributes are stored as columns and the
+    connections are stored as compressed-sparse-row (CSR) arrays, so that
+    graph traversal only involves integer arithmetic.
+
+    out-going edges of node i are
+        targets[offsets[i]:offsets[i + 1]]
+    with delays stored in edge_delays using the same indices. incoming edges
+    are stored in the same fashion (rev_offsets, rev_sources) and follow the
+    order of Node.get_conn_in(), i.e. the position of the source is the mux
+    select value.
+
+    Columns that do not apply to a node type are set to -1, e.g. the track
+    of a port node.
+    """
+    def __init__(self, bit_width: int, nodes: List[Node]):
+        self.bit_width = bit_width
+        # make a copy since we may append nodes that are only reachable
+        # through edges
+        self.nodes: List[Node] = list(nodes)
+        self.__ids: Dict[Node, int] = {}
+        for node in self.nodes:
+            self.__ids[node] = len(self.__ids)
+
+        self.kinds = array("i")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.widths = array("i")
+        self.tracks = array("i")
+        self.sides = array("i")
+        self.ios = array("i")
+        self.names: List[str] = []
+
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        self.edge_delays = array("i")
+
+        # notice that the node list may grow when we see nodes that are not
+        # part of any tile, for instance the ones connected with
+        # force_connect
+        node_id = 0
+        while node_id < len(self.nodes):
+            node = self.nodes[node_id]
+            self.__add_attributes(node)
+            for n in node:
+                self.targets.append(self.__get_or_add_id(n))
+                self.edge_delays.append(node.get_edge_cost(n))
+            self.offsets.append(len(self.targets))
+            for n in node.get_conn_in():
+                self.__get_or_add_id(n)
+            node_id += 1
+
+        self.rev_offsets = array("i", [0])
+        self.rev_sources = array("i")
+        for node in self.nodes:
+            for n in node.get_conn_in():
+                self.rev_sources.append(self.__ids[n])
+            self.rev_offsets.append(len(self.rev_sources))
+
+    def __get_or_add_id(self, node: Node) -> int:
+        if node not in self.__ids:
+            self.__ids[node] = len(self.nodes)
+            self.nodes.append(node)
+        return self.__ids[node]
+
+    def __add_attributes(self, node: Node):
+        self.kinds.append(node.TYPE.value)
+        self.xs.append(node.x)
+        self.ys.append(node.y)
+        self.widths.append(node.width)
+        self.tracks.append(getattr(node, "track", -1))
+        side = getattr(node, "side", None)
+        self.sides.append(-1 if side is None else side.value)
+        io = getattr(node, "io", None)
+        self.ios.append(-1 if io is None else io.value)
+        self.names.append(getattr(node, "name", ""))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def get_id(self, node: Node) -> int:
+        return self.__ids[node]
+
+    def get_node(self, node_id: int) -> Node:
+        return self.nodes[node_id]
+
+    def get_name(self, node_id: int) -> str:
+        return self.names[node_id]
+
+    def get_type(self, node_id: int) -> NodeType:
+        return NodeType(self.kinds[node_id])
+
+    def get_neighbors(self, node_id: int) -> array:
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def get_edge_delays(self, node_id: int) -> array:
+        return self.edge_delays[self.offsets[node_id]:
+                                self.offsets[node_id + 1]]
+
+    def get_conn_in(self, node_id: int) -> array:
+        return self.rev_sources[self.rev_offsets[node_id]:
+                                self.rev_offsets[node_id + 1]]
+
+    def fan_out(self, node_id: int) -> int:
+        return self.offsets[node_id + 1] - self.offsets[node_id]
+
+    def fan_in(self, node_id: int) -> int:
+        return self.rev_offsets[node_id + 1] - self.rev_offsets[node_id]
+
+    def get_memory_usage(self) -> int:
+        """estimated size in bytes of the columns and the CSR arrays. The
+        nodes themselves are not included"""
+        size = sys.getsizeof(self.nodes) + sys.getsizeof(self.__ids)
+        for column in (self.kinds, self.xs, self.ys, self.widths,
+                       self.tracks, self.sides, self.ios, self.offsets,
+                       self.targets, self.edge_delays, self.rev_offsets,
+                       self.rev_sources):
+            size += sys.getsizeof(column)
+        return size + sys.getsizeof(self.names)
+
+
+class MappedGraph:
+    """Read-only graph backed by a memory-mapped file written by
+    InterconnectGraph.dump_binary(), or by the bytes returned by
+    InterconnectGraph.dump_bytes(). It has the same columns and CSR arrays
+    as FrozenGraph, as memoryviews into the file, so opening a graph
+    only reads the header. Node objects are created on demand by get_node()
+    and carry no connections; use the CSR arrays to traverse the graph.
+
+    File layout (little endian): the magic, the format version, the bit
+    width, then the byte offset and size of every section in SECTIONS.
+    Sections are 8-byte aligned arrays of the given type code, except for
+    name_data, which holds the utf-8 encoded node names.
+    """
+    MAGIC = b"CGRA"
+    # section name -> array type code
+    SECTIONS = {"kinds": "b", "xs": "h", "ys": "h", "widths": "h",
+                "tracks": "h", "sides": "b", "ios": "b", "name_offsets": "i",
+                "name_data": "B", "offsets": "i", "targets": "i",
+                "edge_delays": "i", "rev_offsets": "i", "rev_sources": "i",
+                "tiles": "i", "switches": "i", "wires": "i"}
+    __HEADER = struct.Struct("<4sII")
+    __SECTION = struct.Struct("<QQ")
+
+    __SIDES = {side.value: side for side in SwitchBoxSide}
+    __IOS = {io.value: io for io in SwitchBoxIO}
+
+    def __init__(self, source: Union[str, bytes]):
+        """source is either the filename or the content of the file"""
+        if isinstance(source, str):
+            name = source
+            with open(source, "rb") as f:
+                self.__buffer = mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+        else:
+            name = "data"
+            self.__buffer = source
+        magic, version, bit_width = self.__HEADER.unpack_from(self.__buffer)
+        if magic != self.MAGIC:
+            raise ValueError(f"{name} is not a binary graph")
+        if version != BINARY_GRAPH_VERSION:
+            raise ValueError(f"{name} has version {version}, expect "
+                             f"{BINARY_GRAPH_VERSION}")
+        self.bit_width = bit_width
+
+        view = memoryview(self.__buffer)
+        self.__views = [view]
+        sections = {}
+        for i, (name, typecode) in enumerate(self.SECTIONS.items()):
+            start, size = self.__SECTION.unpack_from(
+                self.__buffer, self.__HEADER.size + i * self.__SECTION.size)
+            section = self.__cast(view[start:start + size], typecode)
+            self.__views.append(section)
+            sections[name] = section
+        self.kinds = sections["kinds"]
+        self.xs = sections["xs"]
+        self.ys = sections["ys"]
+        self.widths = sections["widths"]
+        self.tracks = sections["tracks"]
+        self.sides = sections["sides"]
+        self.ios = sections["ios"]
+        self.offsets = sections["offsets"]
+        self.targets = sections["targets"]
+        self.edge_delays = sections["edge_delays"]
+        self.rev_offsets = sections["rev_offsets"]
+        self.rev_sources = sections["rev_sources"]
+        self.__name_offsets = sections["name_offsets"]
+        self.__name_data = sections["name_data"]
+        self.__tiles = sections["tiles"]
+        self.__switches = sections["switches"]
+        self.__wires = sections["wires"]
+
+        # created on demand
+        self.__nodes: Dict[int, Node] = {}
+        self.__ids: Union[Dict[NodeKey, int], None] = None
+
+    @staticmethod
+    def __cast(section: memoryview, typecode: str):
+        if sys.byteorder == "little" or typecode in "bB":
+            return section.cast(typecode)
+        # the file is little endian
+        result = array(typecode, section.tobytes())
+        result.byteswap()
+        return result
+
+    @staticmethod
+    def write(filename: str, bit_width: int,
+              sections: Dict[str, Union[array, bytearray]]):
+        with open(filename, "wb") as f:
+            MappedGraph.__write(f, bit_width, sections)
+
+    @staticmethod
+    def to_bytes(bit_width: int,
+                 sections: Dict[str, Union[array, bytearray]]) -> bytes:
+        """same as write(), but returns the content of the file"""
+        with io.BytesIO() as f:
+            MappedGraph.__write(f, bit_width, sections)
+            return f.getvalue()
+
+    @staticmethod
+    def __write(f, bit_width: int,
+                sections: Dict[str, Union[array, bytearray]]):
+        header_size = MappedGraph.__HEADER.size + \
+            len(MappedGraph.SECTIONS) * MappedGraph.__SECTION.size
+        layout = []
+        data = []
+        position = header_size
+        for name, typecode in MappedGraph.SECTIONS.items():
+            section = sections[name]
+            if isinstance(section, array):
+                # raises OverflowError if the values don't fit
+                section = array(typecode, section)
+                if sys.byteorder != "little":
+                    section.byteswap()
+                section = section.tobytes()
+            position += -position % 8
+            layout.append((position, len(section)))
+            data.append(section)
+            position += len(section)
+        f.write(MappedGraph.__HEADER.pack(MappedGraph.MAGIC,
+                                          BINARY_GRAPH_VERSION, bit_width))
+        for start, size in layout:
+            f.write(MappedGraph.__SECTION.pack(start, size))
+        for (start, _), section in zip(layout, data):
+            f.write(bytes(start - f.tell()))
+            f.write(section)
+
+    def close(self):
+        for view in reversed(self.__views):
+            view.release()
+        self.__views.clear()
+        if isinstance(self.__buffer, mmap.mmap):
+            self.__buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def get_name(self, node_id: int) -> str:
+        start = self.__name_offsets[node_id]
+        end = self.__name_offsets[node_id + 1]
+        return bytes(self.__name_data[start:end]).decode()
+
+    def get_node(self, node_id: int) -> Node:
+        node = self.__nodes.get(node_id)
+        if node is None:
+            node = self.__create_node(node_id)
+            self.__nodes[node_id] = node
+        return node
+
+    def __create_node(self, node_id: int) -> Node:
+        kind = NodeType(self.kinds[node_id])
+        x, y = self.xs[node_id], self.ys[node_id]
+        width, track = self.widths[node_id], self.tracks[node_id]
+        if kind == NodeType.SwitchBox:
+            return SwitchBoxNode(x, y, track, width,
+                                 self.__SIDES[self.sides[node_id]],
+                                 self.__IOS[self.ios[node_id]])
+        elif kind == NodeType.Port:
+            return PortNode(self.get_name(node_id), x, y, width)
+        elif kind == NodeType.Register:
+            return RegisterNode(self.get_name(node_id), x, y, track, width)
+        elif kind == NodeType.RegisterMux:
+            return RegisterMuxNode(x, y, track, width,
+                                   self.__SIDES[self.sides[node_id]])
+        raise ValueError(f"unable to create node of type {kind.name}")
+
+    def get_id(self, node: Node) -> int:
+        """id of the node with the same key. The key index is built on the
+        first call"""
+        if self.__ids is None:
+            self.__ids = {self.get_node(node_id).key(): node_id
+                          for node_id in range(len(self))}
+        return self.__ids[node.key()]
+
+    def get_type(self, node_id: int) -> NodeType:
+        return NodeType(self.kinds[node_id])
+
+    def get_neighbors(self, node_id: int) -> memoryview:
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def get_edge_delays(self, node_id: int) -> memoryview:
+        return self.edge_delays[self.offsets[node_id]:
+                                self.offsets[node_id + 1]]
+
+    def get_conn_in(self, node_id: int) -> memoryview:
+        return self.rev_sources[self.rev_offsets[node_id]:
+                                self.rev_offsets[node_id + 1]]
+
+    def fan_out(self, node_id: int) -> int:
+        return self.offsets[node_id + 1] - self.offsets[node_id]
+
+    def fan_in(self, node_id: int) -> int:
+        return self.rev_offsets[node_id + 1] - self.rev_offsets[node_id]
+
+    def get_tiles(self) -> Iterator[Tuple[int, int, int, int]]:
+        """yields (x, y, height, switch id) of every tile"""
+        tiles = self.__tiles
+        for i in range(0, len(tiles), 4):
+            yield tiles[i], tiles[i + 1], tiles[i + 2], tiles[i + 3]
+
+    def get_switches(self) \
+            -> Dict[int, Tuple[int, Tuple[SBWire, ...]]]:
+        """switch id -> (number of tracks, internal wires)"""
+        switches, wires = self.__switches, self.__wires
+        result = {}
+        num_switches = len(switches) // 3
+        for i in range(num_switches):
+            switch_id, num_track, start = switches[i * 3:i * 3 + 3]
+            end = switches[i * 3 + 5] if i + 1 < num_switches else \
+                len(wires) // 4
+            internal_wires = []
+            for j in range(start, end):
+                track_from, side_from, track_to, side_to = \
+                    wires[j * 4:j * 4 + 4]
+                internal_wires.append((track_from, self.__SIDES[side_from],
+                                       track_to, self.__SIDES[side_to]))
+            result[switch_id] = num_track, tuple(internal_wires)
+        return result
+
+
+class GraphStats:
+    """Size report of one or more graphs, computed from the columns of a
+    FrozenGraph in a single pass over the nodes.
+
+    config_bits follows the circuit generation: connection boxes of input
+    ports, switch box nodes and register muxes get a configuration register
+    of clog2(fan-in) bits whenever the mux has more than one input.
+    """
+    def __init__(self):
+        self.num_nodes: Dict[NodeType, int] = {}
+        self.num_edges = 0
+        # fan-in/fan-out -> number of nodes
+        self.fan_in: Dict[int, int] = {}
+        self.fan_out: Dict[int, int] = {}
+        self.config_bits: Dict[Tuple[int, int], int] = {}
+        # subsystem -> estimated bytes
+        self.memory: Dict[str, int] = {}
+
+    @staticmethod
+    def create(frozen: FrozenGraph) -> "GraphStats":
+        stats = GraphStats()
+        kinds, xs, ys = frozen.kinds, frozen.xs, frozen.ys
+        offsets, rev_offsets = frozen.offsets, frozen.rev_offsets
+        num_nodes = stats.num_nodes
+        fan_in_hist, fan_out_hist = stats.fan_in, stats.fan_out
+        config_bits = stats.config_bits
+        port = NodeType.Port.value
+        configurable = {NodeType.SwitchBox.value, NodeType.RegisterMux.value}
+        node_size = conn_size = 0
+        for node_id, kind in enumerate(kinds):
+            num_nodes[kind] = num_nodes.get(kind, 0) + 1
+            fan_out = offsets[node_id + 1] - offsets[node_id]
+            fan_in = rev_offsets[node_id + 1] - rev_offsets[node_id]
+            fan_out_hist[fan_out] = fan_out_hist.get(fan_out, 0) + 1
+            fan_in_hist[fan_in] = fan_in_hist.get(fan_in, 0) + 1
+            # input ports have no out-going edges
+            has_mux = kind in configurable or (kind == port and fan_out == 0)
+            if has_mux and fan_in > 1:
+                coord = xs[node_id], ys[node_id]
+                sel_bits = (fan_in - 1).bit_length()
+                config_bits[coord] = config_bits.get(coord, 0) + sel_bits
+            size, conn = frozen.nodes[node_id].get_memory_usage()
+            node_size += size
+            conn_size += conn
+        stats.num_nodes = {NodeType(kind): count
+                           for kind, count in num_nodes.items()}
+        stats.num_edges = frozen.num_edges
+        stats.memory["nodes"] = node_size
+        stats.memory["connections"] = conn_size
+        stats.memory["frozen"] = frozen.get_memory_usage()
+        return stats
+
+    @staticmethod
+    def combine(stats: Iterable["GraphStats"]) -> "GraphStats":
+        """adds up the stats of several graphs, e.g. one per bit width"""
+        result = GraphStats()
+        for entry in stats:
+            result.num_edges += entry.num_edges
+            for src, dst in ((entry.num_nodes, result.num_nodes),
+                             (entry.fan_in, result.fan_in),
+                             (entry.fan_out, result.fan_out),
+                             (entry.config_bits, result.config_bits),
+                             (entry.memory, result.memory)):
+                for key, value in src.items():
+                    dst[key] = dst.get(key, 0) + value
+        return result
+
+    @property
+    def total_nodes(self) -> int:
+        return sum(self.num_nodes.values())
+
+    @property
+    def total_config_bits(self) -> int:
+        return sum(self.config_bits.values())
+
+    @property
+    def total_memory(self) -> int:
+        return sum(self.memory.values())
+
+    def __repr__(self):
+        nodes = ", ".join(f"{kind.name}: {count}" for kind, count in
+                          self.num_nodes.items())
+        return f"GraphStats(nodes: {self.total_nodes} ({nodes}), " \
+               f"edges: {self.num_edges}, " \
+               f"config bits: {self.total_config_bits}, " \
+               f"memory: {self.total_memory} bytes)"
+
+
+class ReachabilityIndex:
+    """Answers whether a node can reach a port node, built once from a
+    FrozenGraph or a MappedGraph. Nodes are grouped into strongly connected
+    components, which are computed in reverse topological order, so that the
+    set of ports reachable from a component is the union of its own ports
+    and the sets of its successors. The sets are stored as Python integers
+    where bit i is the i-th port of the graph, so a query is a single
+    bitwise and.
+
+    Use InterconnectGraph.get_reachability() to obtain an index that is
+    rebuilt whenever nodes or connections of the graph change
+    """
+    def __init__(self, frozen: Union[FrozenGraph, "MappedGraph"]):
+        self.frozen = frozen
+        self.components = self.__get_components(frozen)
+        port = NodeType.Port.value
+        self.port_bits: Dict[int, int] = {}
+        for node_id, kind in enumerate(frozen.kinds):
+            if kind == port:
+                self.port_bits[node_id] = 1 << len(self.port_bits)
+
+        # components are numbered in reverse topological order, i.e. every
+        # successor of a component has a smaller number
+        offsets, targets = frozen.offsets, frozen.targets
+        members: List[List[int]] = [[] for _ in range(self.num_components)]
+        for node_id, component in enumerate(self.components):
+            members[component].append(node_id)
+        self.reachable: List[int] = []
+        for component, nodes in enumerate(members):
+            bits = 0
+            for node_id in nodes:
+                bits |= self.port_bits.get(node_id, 0)
+                for i in range(offsets[node_id], offsets[node_id + 1]):
+                    target = self.components[targets[i]]
+                    if target != component:
+                        bits |= self.reachable[target]
+            self.reachable.append(bits)
+
+    @property
+    def num_components(self) -> int:
+        return max(self.components, default=-1) + 1
+
+    @staticmethod
+    def __get_components(frozen: FrozenGraph) -> array:
+        """iterative Tarjan's algorithm. returns the component number of
+        every node"""
+        num_nodes = len(frozen)
+        offsets, targets = frozen.offsets, frozen.targets
+        index = array("i", [-1]) * num_nodes
+        low = array("i", [0]) * num_nodes
+        components = array("i", [-1]) * num_nodes
+        stack = []
+        counter = 0
+        num_components = 0
+        for root in range(num_nodes):
+            if index[root] != -1:
+                continue
+            # (node id, position of the next edge to visit)
+            work = [(root, offsets[root])]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            while work:
+                node_id, edge = work[-1]
+                if edge < offsets[node_id + 1]:
+                    work[-1] = (node_id, edge + 1)
+                    target = targets[edge]
+                    if index[target] == -1:
+                        index[target] = low[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        work.append((target, offsets[target]))
+                    elif components[target] == -1:
+                        # target is still on the stack
+                        low[node_id] = min(low[node_id], index[target])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node_id])
+                if low[node_id] == index[node_id]:
+                    while True:
+                        member = stack.pop()
+                        components[member] = num_components
+                        if member == node_id:
+                            break
+                    num_components += 1
+        return components
+
+    def is_reachable(self, src: Node, dst: PortNode) -> bool:
+        """whether there is a path from src to the port node dst. a node is
+        reachable from itself"""
+        frozen = self.frozen
+        bit = self.port_bits.get(frozen.get_id(dst))
+        if bit is None:
+            raise ValueError(f"{dst} is not a port node")
+        return (self.reachable[self.components[frozen.get_id(src)]] & bit) \
+            != 0
+
+    def get_reachable_ports(self, src: Node) -> List[PortNode]:
+        bits = self.reachable[self.components[self.frozen.get_id(src)]]
+        return [self.frozen.get_node(node_id)
+                for node_id, bit in self.port_bits.items() if bits & bit]
+
 
 def mod(a: int, b: int):
-    while a < 0:
-        a += b
+    # python's modulo already returns a non-negative result for b > 0
     return a % b
 
 
@@ -906,12 +2343,108 @@ class SwitchBoxHelper:
     """A helper class to create switch box internal connections
     Implementation is copied from Cyclone
     https://github.com/Kuree/cgra_pnr/blob/dev/cyclone/src/util.cc
+
+    Wiring patterns are created once per (type, num_tracks) and returned as
+    tuples, so every switch box of the same kind shares the same pattern.
     """
+    # pattern key -> wires
+    __patterns: Dict[Hashable, Tuple[SBWire, ...]] = {}
+    # id(wires) -> [wires, key, fingerprint, fan-out index]. only patterns
+    # created by the helper are indexed, so the ids stay valid
+    __info: Dict[int, list] = {}
+
+    @staticmethod
+    def __get_pattern(key: Hashable,
+                      create_fn: Callable[[], Iterable[SBWire]]) \
+            -> Tuple[SBWire, ...]:
+        wires = SwitchBoxHelper.__patterns.get(key)
+        if wires is None:
+            wires = tuple(create_fn())
+            SwitchBoxHelper.__patterns[key] = wires
+            SwitchBoxHelper.__info[id(wires)] = [wires, key, None, None]
+        return wires
+
+    @staticmethod
+    def __get_info(wires: Sequence[SBWire]) -> Union[list, None]:
+        info = SwitchBoxHelper.__info.get(id(wires))
+        if info is not None and info[0] is wires:
+            return info
+        return None
+
+    @staticmethod
+    def is_shared(wires: Sequence[SBWire]) -> bool:
+        """whether the wires are a cached pattern created by the helper"""
+        return SwitchBoxHelper.__get_info(wires) is not None
+
+    @staticmethod
+    def get_fingerprint(wires: Sequence[SBWire]) -> Tuple[int, frozenset]:
+        info = SwitchBoxHelper.__get_info(wires)
+        if info is None:
+            return len(wires), frozenset(wires)
+        if info[2] is None:
+            info[2] = len(wires), frozenset(wires)
+        return info[2]
+
+    @staticmethod
+    def get_fan_out_index(wires: Sequence[SBWire]) -> SBFanOutIndex:
+        """indexes the wires by (side_from, track_from). The index is cached
+        for shared patterns"""
+        info = SwitchBoxHelper.__get_info(wires)
+        if info is not None and info[3] is not None:
+            return info[3]
+        index: Dict[Tuple[SwitchBoxSide, int],
+                    List[Tuple[int, SwitchBoxSide]]] = {}
+        for track_from, side_from, track_to, side_to in wires:
+            key = side_from, track_from
+            if key not in index:
+                index[key] = []
+            index[key].append((track_to, side_to))
+        result = {key: tuple(value) for key, value in index.items()}
+        if info is not None:
+            info[3] = result
+        return result
+
+    @staticmethod
+    def remove_side(wires: Sequence[SBWire], side: SwitchBoxSide,
+                    io: SwitchBoxIO) -> Tuple[SBWire, ...]:
+        """returns the wires without the ones that go through the side. The
+        input is never modified. If it is a shared pattern, so is the
+        result"""
+
+        def create_fn():
+            for conn in wires:
+                _, side_from, _, side_to = conn
+                if io == SwitchBoxIO.SB_IN and side_from == side:
+                    continue
+                elif io == SwitchBoxIO.SB_OUT and side_to == side:
+                    continue
+                yield conn
+
+        info = SwitchBoxHelper.__get_info(wires)
+        if info is None:
+            return tuple(create_fn())
+        return SwitchBoxHelper.__get_pattern((info[1], side, io), create_fn)
+
+    @staticmethod
+    def get_disjoint_sb_wires(num_tracks: int) -> Tuple[SBWire, ...]:
+        return SwitchBoxHelper.__get_pattern(
+            ("disjoint", num_tracks),
+            lambda: SwitchBoxHelper.__create_disjoint_sb_wires(num_tracks))
+
+    @staticmethod
+    def get_wilton_sb_wires(num_tracks: int) -> Tuple[SBWire, ...]:
+        return SwitchBoxHelper.__get_pattern(
+            ("wilton", num_tracks),
+            lambda: SwitchBoxHelper.__create_wilton_sb_wires(num_tracks))
+
+    @staticmethod
+    def get_imran_sb_wires(num_tracks: int) -> Tuple[SBWire, ...]:
+        return SwitchBoxHelper.__get_pattern(
+            ("imran", num_tracks),
+            lambda: SwitchBoxHelper.__create_imran_sb_wires(num_tracks))
+
     @staticmethod
-    def get_disjoint_sb_wires(num_tracks: int) -> List[Tuple[int,
-                                                             SwitchBoxSide,
-                                                             int,
-                                                             SwitchBoxSide]]:
+    def __create_disjoint_sb_wires(num_tracks: int) -> List[SBWire]:
         result = []
         for track in range(num_tracks):
             for side_from in SwitchBoxSide:
@@ -923,10 +2456,7 @@ class SwitchBoxHelper:
         return result
 
     @staticmethod
-    def get_wilton_sb_wires(num_tracks: int) -> List[Tuple[int,
-                                                           SwitchBoxSide,
-                                                           int,
-                                                           SwitchBoxSide]]:
+    def __create_wilton_sb_wires(num_tracks: int) -> List[SBWire]:
         w = num_tracks
         result = []
         # t_i is defined as
@@ -968,10 +2498,7 @@ class SwitchBoxHelper:
         return result
 
     @staticmethod
-    def get_imran_sb_wires(num_tracks: int) -> List[Tuple[int,
-                                                          SwitchBoxSide,
-                                                          int,
-                                                          SwitchBoxSide]]:
+    def __create_imran_sb_wires(num_tracks: int) -> List[SBWire]:
         w = num_tracks
         result = []
 
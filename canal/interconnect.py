@@ -1,15 +1,32 @@
 import magma
 from ordered_set import OrderedSet
+import multiprocessing
 import os
-from .cyclone import InterconnectGraph, SwitchBoxSide, Node
+from concurrent.futures import ProcessPoolExecutor
+from .cyclone import InterconnectGraph, SwitchBoxSide, Node, NodeKey, NodeType
 from .cyclone import Tile, SwitchBoxNode, SwitchBoxIO, RegisterMuxNode
-from typing import Dict, Tuple, List
+from .cyclone import GraphStats
+from typing import Dict, Tuple, List, Hashable
 from .circuit import TileCircuit, create_name
 from .circuit import ConfigurationType
 from kratos import Generator
 import enum
 
 
+# graphs of the Interconnect in the worker processes of dump_pnr()
+_pnr_graphs: Dict[int, InterconnectGraph] = {}
+
+
+def _set_pnr_graphs(graphs: Dict[int, InterconnectGraph]):
+    # the workers are forked, so graphs is inherited rather than pickled
+    global _pnr_graphs
+    _pnr_graphs = graphs
+
+
+def _dump_pnr_graph(bit_width: int, filename: str):
+    _pnr_graphs[bit_width].dump_graph(filename)
+
+
 @enum.unique
 class GlobalSignalWiring(enum.Enum):
     FanOut = enum.auto()
@@ -71,18 +88,28 @@ class Interconnect(Generator):
         self.x_min, self.x_max = x_min, x_max
         self.y_min, self.y_max = y_min, y_max
 
-        # create individual tile circuits
+        # create individual tile circuits. the first tile of every kind is
+        # built in full, the others with the same signature are clones of it
+        self.tile_definitions: Dict[Hashable, TileCircuit] = {}
         for coord, tiles in self.__tiles.items():
-            self.tile_circuits[coord] =\
-                TileCircuit(tiles, config_addr_width, config_data_width,
-                            stall_signal_width=stall_signal_width)
+            signature = TileCircuit.get_signature(tiles)
+            definition = self.tile_definitions.get(signature)
+            tile_circuit = TileCircuit(tiles, config_addr_width,
+                                       config_data_width,
+                                       stall_signal_width=stall_signal_width,
+                                       definition=definition)
+            if definition is None:
+                self.tile_definitions[signature] = tile_circuit
+            self.tile_circuits[coord] = tile_circuit
 
         # we need to deal with inter-tile connections now
         # we only limit mesh
 
         for (x, y), tile in self.tile_circuits.items():
-            for bit_width, switch_box in tile.sbs.items():
-                all_sbs = switch_box.switchbox.get_all_sbs()
+            # the switch box circuits of a clone belong to its definition, so
+            # the nodes come from the graph tiles
+            for bit_width, graph_tile in tile.tiles.items():
+                all_sbs = graph_tile.switchbox.get_all_sbs()
                 for sb in all_sbs:
                     if sb.io != SwitchBoxIO.SB_OUT:
                         continue
@@ -120,7 +147,7 @@ class Interconnect(Generator):
                         # using the tile-level port is fine
                         dst_tile = self.tile_circuits[(sb_node.x, sb_node.y)]
                         # wire them up
-                        idx = sb_node.get_conn_in().index(src_node)
+                        idx = sb_node.conn_in_index(src_node)
                         dst_sb_name = create_name(str(sb_node))
                         self.wire(tile.ports[src_sb_name],
                                   dst_tile.ports[dst_sb_name][idx])
@@ -181,9 +208,8 @@ class Interconnect(Generator):
         for x, y in coordinates:
             tile = self.tile_circuits[(x, y)]
             # we only lift sb ports
-            sbs = tile.sbs
-            for bit_width, switchbox in sbs.items():
-                all_sbs = switchbox.switchbox.get_all_sbs()
+            for bit_width, graph_tile in tile.tiles.items():
+                all_sbs = graph_tile.switchbox.get_all_sbs()
                 working_set = []
                 if x == self.x_min:
                     # we lift west/left ports
@@ -423,19 +449,42 @@ class Interconnect(Generator):
                     break
         return result
 
-    def dump_pnr(self, dir_name, design_name):
+    def dump_pnr(self, dir_name, design_name, max_workers=1):
+        """writes the graph of every bit width, the layout file and the info
+        file. With more than one worker (None for one per graph, up to the
+        number of CPUs), the graphs are written by a process pool while this
+        process writes the layout file. The workers are forked, so they
+        share the graphs with this process instead of receiving a copy;
+        where fork is not available the files are written one by one"""
         if not os.path.isdir(dir_name):
             os.mkdir(dir_name)
         dir_name = os.path.abspath(dir_name)
         graph_path_dict = {}
-        for bit_width, graph in self.__graphs.items():
-            graph_path = os.path.join(dir_name, f"{bit_width}.graph")
-            graph_path_dict[bit_width] = graph_path
-            graph.dump_graph(graph_path)
-
-        # generate the layout file
+        for bit_width in self.__graphs:
+            graph_path_dict[bit_width] = os.path.join(dir_name,
+                                                      f"{bit_width}.graph")
         layout_file = os.path.join(dir_name, f"{design_name}.layout")
-        self.__dump_layout_file(layout_file)
+        if max_workers is None:
+            max_workers = min(len(self.__graphs), os.cpu_count() or 1)
+
+        if max_workers > 1 and \
+                "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(max_workers, context, _set_pnr_graphs,
+                                     (self.__graphs,)) as pool:
+                futures = [pool.submit(_dump_pnr_graph, bit_width,
+                                       graph_path_dict[bit_width])
+                           for bit_width in self.__graphs]
+                # generate the layout file in the meantime
+                self.__dump_layout_file(layout_file)
+                for future in futures:
+                    # raise the exception from the worker, if any
+                    future.result()
+        else:
+            for bit_width, graph in self.__graphs.items():
+                graph.dump_graph(graph_path_dict[bit_width])
+            # generate the layout file
+            self.__dump_layout_file(layout_file)
         pnr_file = os.path.join(dir_name, f"{design_name}.info")
         with open(pnr_file, "w+") as f:
             f.write(f"layout={layout_file}\n")
@@ -448,14 +497,11 @@ class Interconnect(Generator):
         # empty tiles first first
         with open(layout_file, "w+") as f:
             f.write("LAYOUT   0 20\nBEGIN\n")
+            # write a row at a time
             for y in range(self.y_max + 1):
-                for x in range(self.x_max + 1):
-                    coord = (x, y)
-                    if coord not in self.tile_circuits:
-                        f.write("1")
-                    else:
-                        f.write("0")
-                f.write("\n")
+                row = ["1" if (x, y) not in self.tile_circuits else "0"
+                       for x in range(self.x_max + 1)]
+                f.write("".join(row) + "\n")
             f.write("END\n")
             # looping through the tiles to figure what core it has
             # use default priority 20
@@ -469,49 +515,52 @@ class Interconnect(Generator):
                     f.write(f"LAYOUT {tag} {priority_major} {priority_minor}\n")
                     f.write("BEGIN\n")
                     for y in range(self.y_max + 1):
+                        row = []
                         for x in range(self.x_max + 1):
                             coord = (x, y)
                             if coord not in self.tile_circuits or \
                                     self.tile_circuits[
                                         coord].core.name() != core_name:
-                                f.write("0")
+                                row.append("0")
                             else:
-                                f.write("1")
-                        f.write("\n")
+                                row.append("1")
+                        f.write("".join(row) + "\n")
                     f.write("END\n")
             # handle registers
             assert "r" not in tag_to_name
             r_locs = self.__get_registered_tile()
             f.write(f"LAYOUT r {default_priority} 0\nBEGIN\n")
             for y in range(self.y_max + 1):
-                for x in range(self.x_max + 1):
-                    if (x, y) in r_locs:
-                        f.write("1")
-                    else:
-                        f.write("0")
-                f.write("\n")
+                row = ["1" if (x, y) in r_locs else "0"
+                       for x in range(self.x_max + 1)]
+                f.write("".join(row) + "\n")
             f.write("END\n")
 
     def parse_node(self, node_str):
         if node_str[0] == "SB":
             track, x, y, side, io_, bit_width = node_str[1:]
-            graph = self.get_graph(bit_width)
-            return graph.get_sb(x, y, SwitchBoxSide(side), track,
-                                SwitchBoxIO(io_))
+            key = NodeKey(NodeType.SwitchBox, x, y, track, SwitchBoxSide(side),
+                          SwitchBoxIO(io_), None, bit_width)
         elif node_str[0] == "PORT":
             port_name, x, y, bit_width = node_str[1:]
-            graph = self.get_graph(bit_width)
-            return graph.get_port(x, y, port_name)
+            key = NodeKey(NodeType.Port, x, y, None, None, None, port_name,
+                          bit_width)
         elif node_str[0] == "REG":
             reg_name, track, x, y, bit_width = node_str[1:]
-            graph = self.get_graph(bit_width)
-            return graph.get_tile(x, y).switchbox.registers[reg_name]
+            key = NodeKey(NodeType.Register, x, y, track, None, None,
+                          reg_name, bit_width)
         elif node_str[0] == "RMUX":
-            rmux_name, x, y, bit_width = node_str[1:]
-            graph = self.get_graph(bit_width)
-            return graph.get_tile(x, y).switchbox.reg_muxs[rmux_name]
+            track, x, y, side, bit_width = node_str[1:]
+            key = NodeKey(NodeType.RegisterMux, x, y, track,
+                          SwitchBoxSide(side), None, f"{side}_{track}",
+                          bit_width)
         else:
             raise Exception("Unknown node " + " ".join(node_str))
+        graph = self.get_graph(bit_width)
+        node = graph.find_node(key)
+        if node is None:
+            raise KeyError(" ".join(map(str, node_str)))
+        return node
 
     def clone(self):
         bit_widths = self.get_bit_widths()
@@ -540,6 +589,12 @@ class Interconnect(Generator):
     def get_graph(self, bit_width: int):
         return self.__graphs[bit_width]
 
+    def get_stats(self) -> GraphStats:
+        """stats of all the graphs combined. Use
+        get_graph(bit_width).get_stats() for a single bit width"""
+        return GraphStats.combine(graph.get_stats()
+                                  for graph in self.__graphs.values())
+
     def get_bit_widths(self):
         return list(self.__graphs.keys())
 
@@ -0,0 +1,259 @@
+"""
+A negotiated congestion router based on PathFinder:
+
+L. McMurchie and C. Ebeling, "PathFinder: A Negotiation-Based
+Performance-Driven Router for FPGAs", FPGA 1995
+
+The router works on the integer indexed FrozenGraph of an InterconnectGraph
+and returns the routes as graph nodes, in the same format consumed by
+Interconnect.get_route_bitstream().
+"""
+import heapq
+from array import array
+from typing import Dict, List, Tuple, Set
+from .cyclone import InterconnectGraph, FrozenGraph, Node, PortNode, \
+    NodeType
+
+
+class Router:
+    """Routes nets on a single bit-width graph. Every node can be used by one
+    net only; nets that compete for the same node negotiate through the
+    present and history congestion costs until no node is overused.
+
+    The cost of entering node n through an edge with delay d is
+        (1 + d + history[n]) * (1 + present_factor * occupancy[n])
+    and A* uses the Manhattan distance to the sink, scaled by astar_factor
+    over the longest wire in the graph, as the estimate of the remaining
+    cost. Values of astar_factor larger than 1 trade route quality for speed.
+    """
+    def __init__(self, graph: InterconnectGraph,
+                 max_iterations: int = 50,
+                 present_factor: float = 0.5,
+                 present_growth: float = 1.5,
+                 history_factor: float = 1.0,
+                 astar_factor: float = 1.0):
+        self.graph = graph
+        self.max_iterations = max_iterations
+        self.present_factor = present_factor
+        self.present_growth = present_growth
+        self.history_factor = history_factor
+        self.astar_factor = astar_factor
+
+    def route(self, nets: Dict[str, Tuple[PortNode, List[PortNode]]]) \
+            -> Dict[str, List[List[Node]]]:
+        """nets maps the net id to its source port and sink ports. The route
+        of a net has one segment per sink, in the order of the sinks, and each
+        segment is the full path from the source port to that sink"""
+        frozen = self.graph.freeze()
+        terminals = {}
+        # a port can only be a terminal of one net
+        port_nets = {}
+        for net_id, (src, sinks) in nets.items():
+            for port in [src] + sinks:
+                if port_nets.setdefault(port, net_id) != net_id:
+                    raise ValueError(f"{port} is used by both net "
+                                     f"{port_nets[port]} and {net_id}")
+            terminals[net_id] = (self.__get_id(frozen, src),
+                                 [self.__get_id(frozen, sink)
+                                  for sink in sinks])
+
+        search = _Search(frozen, self.astar_factor)
+        # node id -> parent node id. the source has -1
+        trees: Dict[str, Dict[int, int]] = {}
+        present_factor = self.present_factor
+        nets_to_route = list(terminals.keys())
+        for _ in range(self.max_iterations):
+            for net_id in nets_to_route:
+                tree = trees.pop(net_id, None)
+                if tree is not None:
+                    search.rip_up(tree)
+                src, sinks = terminals[net_id]
+                trees[net_id] = search.route_net(net_id, src, sinks,
+                                                 present_factor)
+
+            overused = search.get_overused(trees.values())
+            if not overused:
+                return self.__get_routes(frozen, terminals, trees)
+            search.update_history(overused, self.history_factor)
+            present_factor *= self.present_growth
+            # only reroute the nets that are involved in congestion
+            nets_to_route = [net_id for net_id, tree in trees.items()
+                             if not overused.isdisjoint(tree)]
+
+        raise RuntimeError(f"unable to route {len(nets)} nets in "
+                           f"{self.max_iterations} iterations")
+
+    @staticmethod
+    def __get_id(frozen: FrozenGraph, port: PortNode) -> int:
+        try:
+            return frozen.get_id(port)
+        except KeyError:
+            raise ValueError(f"{port} is not part of the graph")
+
+    @staticmethod
+    def __get_routes(frozen: FrozenGraph,
+                     terminals: Dict[str, Tuple[int, List[int]]],
+                     trees: Dict[str, Dict[int, int]]) \
+            -> Dict[str, List[List[Node]]]:
+        result = {}
+        for net_id, (_, sinks) in terminals.items():
+            tree = trees[net_id]
+            route = []
+            for sink in sinks:
+                segment = []
+                node_id = sink
+                while node_id != -1:
+                    segment.append(frozen.get_node(node_id))
+                    node_id = tree[node_id]
+                segment.reverse()
+                route.append(segment)
+            result[net_id] = route
+        return result
+
+
+class _Search:
+    """congestion state and the A* search. Everything is indexed by the node
+    id of the frozen graph"""
+    def __init__(self, frozen: FrozenGraph, astar_factor: float):
+        self.frozen = frozen
+        num_nodes = len(frozen)
+        self.occupancy = array("i", [0]) * num_nodes
+        self.history = array("d", [0.0]) * num_nodes
+        port = NodeType.Port.value
+        self.is_port = [kind == port for kind in frozen.kinds]
+        self.distance_cost, self.distance_offset = \
+            self.__get_distance_cost(frozen, astar_factor)
+
+    @staticmethod
+    def __get_distance_cost(frozen: FrozenGraph,
+                            astar_factor: float) -> Tuple[float, float]:
+        """lower bound of the cost to travel a given Manhattan distance.
+        every node costs at least 1, and any two consecutive edges span at
+        most max_span tiles, so a path covering distance d has at least
+        2 * d / max_span - 1 edges"""
+        xs, ys, offsets, targets = frozen.xs, frozen.ys, frozen.offsets, \
+            frozen.targets
+        num_nodes = len(frozen)
+        out_spans = array("i", [0]) * num_nodes
+        for node_id in range(num_nodes):
+            x, y = xs[node_id], ys[node_id]
+            out_span = 0
+            for target in targets[offsets[node_id]:offsets[node_id + 1]]:
+                span = abs(xs[target] - x) + abs(ys[target] - y)
+                if span > out_span:
+                    out_span = span
+            out_spans[node_id] = out_span
+        max_span = 1
+        for node_id in range(num_nodes):
+            x, y = xs[node_id], ys[node_id]
+            for target in targets[offsets[node_id]:offsets[node_id + 1]]:
+                span = abs(xs[target] - x) + abs(ys[target] - y) + \
+                    out_spans[target]
+                if span > max_span:
+                    max_span = span
+        return 2 * astar_factor / max_span, astar_factor
+
+    def rip_up(self, tree: Dict[int, int]):
+        occupancy = self.occupancy
+        for node_id in tree:
+            occupancy[node_id] -= 1
+
+    def route_net(self, net_id: str, src: int, sinks: List[int],
+                  present_factor: float) -> Dict[int, int]:
+        frozen = self.frozen
+        xs, ys = frozen.xs, frozen.ys
+        tree = {src: -1}
+        # closest sinks first, so that farther sinks can branch off
+        src_x, src_y = xs[src], ys[src]
+
+        def get_distance(node_id: int):
+            return abs(xs[node_id] - src_x) + abs(ys[node_id] - src_y)
+
+        order = sorted(sinks, key=get_distance)
+        for sink in order:
+            if sink in tree:
+                continue
+            path = self.__search(tree, sink, present_factor)
+            if path is None:
+                raise RuntimeError(f"net {net_id}: {frozen.get_node(sink)} "
+                                   f"is not reachable from "
+                                   f"{frozen.get_node(src)}")
+            for node_id, parent in path:
+                tree[node_id] = parent
+        occupancy = self.occupancy
+        for node_id in tree:
+            occupancy[node_id] += 1
+        return tree
+
+    def __search(self, tree: Dict[int, int], sink: int,
+                 present_factor: float) -> List[Tuple[int, int]]:
+        frozen = self.frozen
+        xs, ys = frozen.xs, frozen.ys
+        offsets, targets, delays = frozen.offsets, frozen.targets, \
+            frozen.edge_delays
+        occupancy, history, is_port = self.occupancy, self.history, \
+            self.is_port
+        sink_x, sink_y = xs[sink], ys[sink]
+        distance_cost = self.distance_cost
+        distance_offset = self.distance_offset
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        # the whole route tree of the net is the start of the search. heap
+        # entries are (estimated total cost, -cost, node), i.e. ties are
+        # broken towards the nodes closer to the sink
+        costs = {}
+        heap = []
+        for node_id in tree:
+            costs[node_id] = 0.0
+            distance = abs(xs[node_id] - sink_x) + abs(ys[node_id] - sink_y)
+            estimate = distance * distance_cost - distance_offset
+            heap.append((estimate, -0.0, node_id))
+        heapq.heapify(heap)
+        parents = {}
+        while heap:
+            _, cost, node_id = heappop(heap)
+            cost = -cost
+            if node_id == sink:
+                break
+            if cost > costs[node_id]:
+                # outdated entry
+                continue
+            for i in range(offsets[node_id], offsets[node_id + 1]):
+                target = targets[i]
+                if is_port[target] and target != sink:
+                    # ports are only used as terminals
+                    continue
+                new_cost = cost + (1 + delays[i] + history[target]) * \
+                    (1 + present_factor * occupancy[target])
+                if new_cost < costs.get(target, new_cost + 1):
+                    costs[target] = new_cost
+                    parents[target] = node_id
+                    distance = abs(xs[target] - sink_x) + \
+                        abs(ys[target] - sink_y)
+                    estimate = distance * distance_cost - distance_offset
+                    heappush(heap, (new_cost + estimate, -new_cost, target))
+        else:
+            return None
+
+        # walk back to the route tree
+        path = []
+        node_id = sink
+        while node_id not in tree:
+            parent = parents[node_id]
+            path.append((node_id, parent))
+            node_id = parent
+        return path
+
+    def get_overused(self, trees) -> Set[int]:
+        occupancy = self.occupancy
+        result = set()
+        for tree in trees:
+            for node_id in tree:
+                if occupancy[node_id] > 1:
+                    result.add(node_id)
+        return result
+
+    def update_history(self, overused: Set[int], history_factor: float):
+        occupancy, history = self.occupancy, self.history
+        for node_id in overused:
+            history[node_id] += history_factor * (occupancy[node_id] - 1)
@@ -1,9 +1,10 @@
 from gemstone.common.core import Core
-from typing import Tuple, List, Dict, Callable
+from typing import Tuple, List, Dict, Callable, Union, Iterator
 from .cyclone import SwitchBoxSide, SwitchBoxIO, InterconnectPolicy, \
     InterconnectGraph, DisjointSwitchBox, WiltonSwitchBox, \
     ImranSwitchBox, Tile, SwitchBox
 from .circuit import CoreInterface
+from array import array
 import enum
 
 
@@ -44,6 +45,96 @@ def get_array_size(width, height, io_sides):
     return x_min, x_max, y_min, y_max
 
 
+class ArrayLayout:
+    """Per-coordinate layout of the array, computed once for all the tiles.
+    Every table is a flat array indexed by x * height + y"""
+    # side code used for tiles that are not on the IO margin
+    NO_SIDE = -1
+
+    def __init__(self, width: int, height: int, io_sides: IOSide,
+                 track_info: Dict[int, int] = None):
+        if io_sides & IOSide.None_:
+            io_sides = IOSide.None_
+        self.width = width
+        self.height = height
+        self.x_min, self.x_max, self.y_min, self.y_max = \
+            get_array_size(width, height, io_sides)
+
+        size = width * height
+        self.num_tracks = array("I", [0]) * size
+        self.interior = array("B", [0]) * size
+        self.io_side = array("b", [self.NO_SIDE]) * size
+
+        x_min, x_max, y_min, y_max = self.x_min, self.x_max, self.y_min, \
+            self.y_max
+        inner_height = max(y_max - y_min + 1, 0)
+        for x in range(x_min, x_max + 1):
+            start = x * height + y_min
+            self.interior[start:start + inner_height] = \
+                array("B", [1]) * inner_height
+        # a track of length l starts at every l-th tile, measured from the
+        # top left corner of the array
+        if track_info is not None:
+            num_tracks = self.num_tracks
+            for length, num_track in track_info.items():
+                for x in range(x_min, x_max + 1, length):
+                    offset = x * height
+                    for y in range(y_min, y_max + 1, length):
+                        num_tracks[offset + y] += num_track
+        # margin tiles are assigned to the side of the array they are on.
+        # corner tiles belong to the west or east side
+        west = SwitchBoxSide.WEST.value
+        east = SwitchBoxSide.EAST.value
+        north = SwitchBoxSide.NORTH.value
+        south = SwitchBoxSide.SOUTH.value
+        for x in range(width):
+            offset = x * height
+            if x < x_min:
+                self.io_side[offset:offset + height] = \
+                    array("b", [west]) * height
+            elif x > x_max:
+                self.io_side[offset:offset + height] = \
+                    array("b", [east]) * height
+            else:
+                self.io_side[offset:offset + y_min] = \
+                    array("b", [north]) * y_min
+                num_south = height - y_max - 1
+                self.io_side[offset + y_max + 1:offset + height] = \
+                    array("b", [south]) * num_south
+
+    def get_num_tracks(self, x: int, y: int) -> int:
+        return self.num_tracks[x * self.height + y]
+
+    def is_interior(self, x: int, y: int) -> bool:
+        return self.interior[x * self.height + y] == 1
+
+    def get_io_side(self, x: int, y: int) -> Union[SwitchBoxSide, None]:
+        """returns the side of the array a margin tile is on. None for
+        interior tiles"""
+        side = self.io_side[x * self.height + y]
+        if side == self.NO_SIDE:
+            return None
+        return _SIDES[side]
+
+    def get_margin_tiles(self) -> Iterator[Tuple[int, int, SwitchBoxSide]]:
+        """iterates through the margin tiles and their sides, in column
+        order"""
+        height = self.height
+        for index, side in enumerate(self.io_side):
+            if side != self.NO_SIDE:
+                yield index // height, index % height, _SIDES[side]
+
+
+_SIDES = {side.value: side for side in SwitchBoxSide}
+# offset to the nearby tile inside the array, indexed by margin side
+_NEXT_TILE_OFFSET = {
+    SwitchBoxSide.WEST: (1, 0),
+    SwitchBoxSide.EAST: (-1, 0),
+    SwitchBoxSide.NORTH: (0, 1),
+    SwitchBoxSide.SOUTH: (0, -1)
+}
+
+
 # helper functions to create column-based CGRA interconnect
 def create_uniform_interconnect(width: int,
                                 height: int,
@@ -88,18 +179,18 @@ def create_uniform_interconnect(width: int,
     if io_sides & IOSide.None_ or io_conn is None:
         io_conn = {"in": {}, "out": {}}
     tile_height = 1
-    interconnect = InterconnectGraph(track_width)
+    interconnect = InterconnectGraph(track_width, width, height)
     # based on the IO sides specified. these are inclusive
     # once it's assigned to None, nullify everything
     if io_sides & IOSide.None_:
         io_sides = IOSide.None_
-    x_min, x_max, y_min, y_max = get_array_size(width, height, io_sides)
+    layout = ArrayLayout(width, height, io_sides, track_info)
+    x_min, x_max, y_min, y_max = layout.x_min, layout.x_max, layout.y_min, \
+        layout.y_max
     # create tiles and set cores
     for x in range(x_min, x_max + 1):
         for y in range(y_min, y_max + 1, tile_height):
-            # compute the number of tracks
-            num_track = compute_num_tracks(x_min, y_min,
-                                           x, y, track_info)
+            num_track = layout.get_num_tracks(x, y)
             # create switch based on the type passed in
             if sb_type == SwitchBoxType.Disjoint:
                 sb = DisjointSwitchBox(x, y, num_track, track_width)
@@ -136,33 +227,17 @@ def create_uniform_interconnect(width: int,
     for port_name in port_names:
         conns = port_connections[port_name]
         interconnect.set_core_connection_all(port_name, conns)
-    # set the actual interconnections
-    # sort the tracks by length
-    track_lens = list(track_info.keys())
-    track_lens.sort()
-    current_track = 0
-    for track_len in track_lens:
-        for _ in range(track_info[track_len]):
-            interconnect.connect_switchbox(x_min, y_min, x_max,
-                                           y_max,
-                                           track_len,
-                                           current_track,
-                                           InterconnectPolicy.Ignore)
-            current_track += 1
+    # set the actual interconnections. tracks are sorted by length
+    interconnect.connect_switchboxes(x_min, y_min, x_max, y_max, track_info,
+                                     InterconnectPolicy.Ignore)
 
     # insert io
-    connect_io(interconnect, io_conn["in"], io_conn["out"], io_sides)
+    connect_io(interconnect, io_conn["in"], io_conn["out"], io_sides,
+               layout)
 
     # insert pipeline register
-    if pipeline_reg is None:
-        pipeline_reg = []
-    for track, side in pipeline_reg:
-        for coord in interconnect:
-            tile = interconnect[coord]
-            if tile.switchbox is None or tile.switchbox.num_track == 0:
-                continue
-            if track < tile.switchbox.num_track:
-                tile.switchbox.add_pipeline_register(side, track)
+    if pipeline_reg is not None:
+        interconnect.add_pipeline_registers(pipeline_reg)
 
     return interconnect
 
@@ -170,58 +245,45 @@ def create_uniform_interconnect(width: int,
 def connect_io(interconnect: InterconnectGraph,
                input_port_conn: Dict[str, List[int]],
                output_port_conn: Dict[str, List[int]],
-               io_sides: IOSide):
-    """connect tiles on the side"""
+               io_sides: IOSide, layout: ArrayLayout = None):
+    """connect tiles on the side. layout is computed from the graph size if
+    not provided"""
     if io_sides & IOSide.None_:
         return
 
-    width, height = interconnect.get_size()
-    x_min, x_max, y_min, y_max = get_array_size(width, height, io_sides)
+    if layout is None:
+        width, height = interconnect.get_size()
+        layout = ArrayLayout(width, height, io_sides)
     # compute tiles and sides
-    for x in range(width):
-        for y in range(height):
-            if x in range(x_min, x_max + 1) and \
-                    y in range(y_min, y_max + 1):
-                continue
-            # make sure that these margins tiles have empty switch boxes
-            tile = interconnect[(x, y)]
-            if tile.core.core is None:
-                continue
-            assert tile.switchbox.num_track == 0
-            # compute the nearby tile
-            if x in range(0, x_min):
-                next_tile = interconnect[(x + 1, y)]
-                side = SwitchBoxSide.WEST
-            elif x in range(x_max + 1, width):
-                next_tile = interconnect[(x - 1, y)]
-                side = SwitchBoxSide.EAST
-            elif y in range(0, y_min):
-                next_tile = interconnect[(x, y + 1)]
-                side = SwitchBoxSide.NORTH
-            else:
-                assert y in range(y_max + 1, height)
-                next_tile = interconnect[(x, y - 1)]
-                side = SwitchBoxSide.SOUTH
-            for input_port, conn in input_port_conn.items():
-                # input is from fabric to IO
-                if input_port in tile.ports:
-                    port_node = tile.ports[input_port]
-                    if port_node.width != interconnect.bit_width:
-                        continue
-                    for track in conn:
-                        # to be conservative when connecting the nodes
-                        if track < next_tile.switchbox.num_track:
-                            sb_node = next_tile.get_sb(side, track,
-                                                       SwitchBoxIO.SB_OUT)
-                            sb_node.add_edge(port_node)
-            for output_port, conn in output_port_conn.items():
-                # output is IO to fabric
-                if output_port in tile.ports:
-                    port_node = tile.ports[output_port]
-                    if port_node.width != interconnect.bit_width:
-                        continue
-                    for track in conn:
-                        if track < next_tile.switchbox.num_track:
-                            sb_node = next_tile.get_sb(side, track,
-                                                       SwitchBoxIO.SB_IN)
-                            port_node.add_edge(sb_node)
+    for x, y, side in layout.get_margin_tiles():
+        # make sure that these margins tiles have empty switch boxes
+        tile = interconnect[(x, y)]
+        if tile.core.core is None:
+            continue
+        assert tile.switchbox.num_track == 0
+        # compute the nearby tile
+        dx, dy = _NEXT_TILE_OFFSET[side]
+        next_tile = interconnect[(x + dx, y + dy)]
+        for input_port, conn in input_port_conn.items():
+            # input is from fabric to IO
+            if input_port in tile.ports:
+                port_node = tile.ports[input_port]
+                if port_node.width != interconnect.bit_width:
+                    continue
+                for track in conn:
+                    # to be conservative when connecting the nodes
+                    if track < next_tile.switchbox.num_track:
+                        sb_node = next_tile.get_sb(side, track,
+                                                   SwitchBoxIO.SB_OUT)
+                        sb_node.add_edge(port_node)
+        for output_port, conn in output_port_conn.items():
+            # output is IO to fabric
+            if output_port in tile.ports:
+                port_node = tile.ports[output_port]
+                if port_node.width != interconnect.bit_width:
+                    continue
+                for track in conn:
+                    if track < next_tile.switchbox.num_track:
+                        sb_node = next_tile.get_sb(side, track,
+                                                   SwitchBoxIO.SB_IN)
+                        port_node.add_edge(sb_node)
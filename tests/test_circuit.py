@@ -53,6 +53,64 @@ def test_cb(num_tracks: int, bit_width: int):
                                flags=["-Wno-fatal"])
 
 
+def test_route_configs():
+    addr_width = 8
+    data_width = 32
+    num_tracks = 2
+    x = 0
+    y = 0
+
+    core = CoreInterface(DummyCore())
+    tiles: Dict[int, Tile] = {}
+    for bit_width in [1, 16]:
+        switchbox = DisjointSwitchBox(x, y, num_tracks, bit_width)
+        tile = Tile(x, y, bit_width, switchbox)
+        tile.set_core(core)
+        tile.set_core_connection(f"data_in_{bit_width}b",
+                                 [SBConnectionType(side, track,
+                                                   SwitchBoxIO.SB_IN)
+                                  for track in range(num_tracks)
+                                  for side in SwitchBoxSide])
+        tile.set_core_connection(f"data_out_{bit_width}b",
+                                 [SBConnectionType(side, track,
+                                                   SwitchBoxIO.SB_OUT)
+                                  for track in range(num_tracks)
+                                  for side in SwitchBoxSide])
+        tiles[bit_width] = tile
+    tile_circuit = TileCircuit(tiles, addr_width, data_width)
+    tile_circuit.finalize()
+
+    # USAGE
+    route_configs = tile_circuit.get_route_configs()
+
+    # TESTS
+    assert tile_circuit.get_route_configs() is route_configs
+    num_configs = 0
+    for bit_width, tile in tiles.items():
+        for node in tile.get_all_nodes():
+            if isinstance(node, PortNode):
+                circuit = tile_circuit.cbs.get(node.name)
+            else:
+                circuit = tile_circuit.sbs[bit_width]
+            if circuit is None or len(node.get_conn_in()) < 2:
+                continue
+            config_names = sorted(circuit.registers.keys())
+            reg_index = config_names.index(get_mux_sel_name(node))
+            feature_addr = tile_circuit.features().index(circuit)
+            for src_node in node.get_conn_in():
+                config = reg_index, feature_addr, \
+                    node.conn_in_index(src_node)
+                assert route_configs[(src_node, node)] == config
+                assert tile_circuit.get_route_bitstream_config(
+                    src_node, node) == config
+                num_configs += 1
+    assert len(route_configs) == num_configs
+    # connections that are not in the table still fail the checks
+    with pytest.raises(AssertionError):
+        tile_circuit.get_route_bitstream_config(
+            tiles[16].ports["data_out_16b"], tiles[16].ports["data_in_16b"])
+
+
 # helper function to find reg node connect to a sb_node, if any
 def find_reg_mux_node(node: Node) -> Union[Tuple[None, None],
                                            Tuple[RegisterNode,
@@ -453,3 +511,79 @@ def test_tile(num_tracks: int):
                                magma_output="coreir-verilog",
                                directory=tempdir,
                                flags=["-Wno-fatal"])
+
+
+def create_dummy_tiles(x: int, y: int, num_tracks: int) -> Dict[int, Tile]:
+    core = CoreInterface(DummyCore())
+    tiles: Dict[int, Tile] = {}
+    for bit_width in [1, 16]:
+        switchbox = DisjointSwitchBox(x, y, num_tracks, bit_width)
+        tile = Tile(x, y, bit_width, switchbox)
+        tile.set_core(core)
+        tile.set_core_connection(f"data_in_{bit_width}b",
+                                 [SBConnectionType(side, track,
+                                                   SwitchBoxIO.SB_IN)
+                                  for track in range(num_tracks)
+                                  for side in SwitchBoxSide])
+        tile.set_core_connection(f"data_out_{bit_width}b",
+                                 [SBConnectionType(side, track,
+                                                   SwitchBoxIO.SB_OUT)
+                                  for track in range(num_tracks)
+                                  for side in SwitchBoxSide])
+        tiles[bit_width] = tile
+    return tiles
+
+
+def get_relative_route_configs(tile_circuit: TileCircuit):
+    def get_key(node: Node):
+        return node.key()._replace(x=node.x - tile_circuit.x,
+                                   y=node.y - tile_circuit.y)
+
+    return {(get_key(src_node), get_key(dst_node)): config
+            for (src_node, dst_node), config in
+            tile_circuit.get_route_configs().items()}
+
+
+def test_tile_clone():
+    addr_width = 8
+    data_width = 32
+    num_tracks = 2
+    tiles = create_dummy_tiles(0, 0, num_tracks)
+    clone_tiles = create_dummy_tiles(1, 0, num_tracks)
+    other_tiles = create_dummy_tiles(2, 0, num_tracks)
+    other_tiles[16].switchbox.remove_side_sbs(SwitchBoxSide.NORTH,
+                                              SwitchBoxIO.SB_IN)
+
+    # USAGE
+    signature = TileCircuit.get_signature(tiles)
+    definition = TileCircuit(tiles, addr_width, data_width)
+    tile_circuit = TileCircuit(clone_tiles, addr_width, data_width,
+                               definition=definition)
+
+    # TESTS
+    assert TileCircuit.get_signature(clone_tiles) == signature
+    assert TileCircuit.get_signature(other_tiles) != signature
+    assert not definition.is_cloned
+    assert tile_circuit.is_cloned
+    assert tile_circuit.definition is definition
+    assert tile_circuit.x == 1 and tile_circuit.y == 0
+    assert tile_circuit.core is clone_tiles[16].core.core
+    # the clone uses the circuits of the definition, but doesn't share its
+    # dicts
+    assert tile_circuit.sbs == definition.sbs
+    assert tile_circuit.sbs is not definition.sbs
+    assert tile_circuit.cbs == definition.cbs
+    assert tile_circuit.cbs is not definition.cbs
+    assert sorted(tile_circuit.ports) == sorted(definition.ports)
+    # same configuration addresses as the definition
+    assert tile_circuit.features()[len(tile_circuit.core.features()):] == \
+        definition.features()[len(definition.core.features()):]
+    assert get_relative_route_configs(tile_circuit) == \
+        get_relative_route_configs(definition)
+
+    # finalizing the clone finalizes the definition, and the clone gets the
+    # ports added by it
+    tile_circuit.finalize()
+    assert definition.finalized
+    assert "config" in definition.ports
+    assert sorted(tile_circuit.ports) == sorted(definition.ports)
@@ -2,8 +2,12 @@
 test_circuit.py, we will focus on functions have not been fully tested yet """
 from canal.cyclone import *
 from gemstone.common.dummy_core_magma import DummyCore
-from canal.util import create_uniform_interconnect, SwitchBoxType
+from canal.util import create_uniform_interconnect, SwitchBoxType, IOSide
+import filecmp
+import os
+import pickle
 import pytest
+import tempfile
 
 
 def test_remove_side_sb():
@@ -50,6 +54,39 @@ def test_remove_side_sb():
     assert len(all_sbs) == (2 * 4 - 1) * num_tracks
 
 
+def test_shared_sb_wires():
+    num_tracks = 3
+    # USAGE
+    wires = SwitchBoxHelper.get_imran_sb_wires(num_tracks)
+    switch0 = ImranSwitchBox(0, 0, num_tracks, 16)
+    switch1 = ImranSwitchBox(1, 0, num_tracks, 1)
+    switch0.remove_side_sbs(SwitchBoxSide.WEST, SwitchBoxIO.SB_IN)
+    switch1.remove_side_sbs(SwitchBoxSide.WEST, SwitchBoxIO.SB_IN)
+
+    # TESTS
+    assert isinstance(wires, tuple)
+    assert SwitchBoxHelper.get_imran_sb_wires(num_tracks) is wires
+    assert SwitchBoxHelper.is_shared(wires)
+    # removing a side does not change the shared pattern
+    assert ImranSwitchBox(0, 0, num_tracks, 16).internal_wires is wires
+    assert switch0.internal_wires is switch1.internal_wires
+    assert switch0.internal_wires is not wires
+    assert all(side_from != SwitchBoxSide.WEST
+               for _, side_from, _, _ in switch0.internal_wires)
+    # fan-out queries match the wire list
+    for side in SwitchBoxSide:
+        for track in range(num_tracks):
+            expected = [(track_to, side_to)
+                        for track_from, side_from, track_to, side_to in wires
+                        if (side_from, track_from) == (side, track)]
+            switch = SwitchBox(0, 0, num_tracks, 16, wires)
+            assert list(switch.get_fan_out(side, track)) == expected
+            assert not switch.materialized
+    assert switch0.get_fan_out(SwitchBoxSide.WEST, 0) == ()
+    # negative numbers are wrapped around
+    assert mod(-1, num_tracks) == num_tracks - 1
+
+
 def test_tiling():
     """test low-level tiling. we expect the tiling be handled internally.
     as a result, users do not need to create a graph tile by hand
@@ -96,6 +133,33 @@ def test_tiling():
     assert not interconnect.has_empty_tile()
 
 
+def test_add_tiles():
+    # same layout as test_tiling
+    tiles = [Tile.create_tile(0, 0, 1, 16, []),
+             Tile.create_tile(1, 2, 1, 16, [], height=2),
+             Tile.create_tile(0, 1, 1, 16, [], height=3)]
+    interconnect = InterconnectGraph(16, 2, 4)
+    assert interconnect.get_size() == (2, 4)
+    assert interconnect.has_empty_tile()
+
+    # USAGE
+    interconnect.add_tiles(tiles)
+
+    # TESTS
+    assert interconnect.get_size() == (2, 4)
+    assert interconnect.get_tile(0, 3) is tiles[2]
+    assert interconnect.get_tile(1, 3) is tiles[1]
+    assert interconnect.has_empty_tile()
+    interconnect.add_tiles([Tile.create_tile(1, 0, 1, 16, [], height=2)])
+    assert not interconnect.has_empty_tile()
+    # the grid still grows automatically
+    interconnect.add_tile(Tile.create_tile(2, 0, 1, 16, []))
+    assert interconnect.get_size() == (3, 4)
+    assert interconnect.has_empty_tile()
+    with pytest.raises(RuntimeError):
+        interconnect.add_tiles([Tile.create_tile(0, 2, 1, 16, [])])
+
+
 def test_policy_ignore():
     """test low-level interconnect policy based connection"""
     width = 16
@@ -287,3 +351,706 @@ def test_uniform(chip_size: int, num_track: int, track_width):
                                               SwitchBoxIO.SB_IN)
                 assert tile_from_sb in ic and tile_to_sb in ic
                 assert tile_to_sb in tile_from_sb
+
+
+def test_freeze():
+    chip_size = 3
+    num_track = 2
+    track_width = 16
+
+    def dummy_col(_: int, __: int):
+        return DummyCore()
+
+    in_conn = [(SwitchBoxSide.WEST, SwitchBoxIO.SB_IN)]
+    out_conn = [(SwitchBoxSide.EAST, SwitchBoxIO.SB_OUT)]
+    pipeline_regs = [(0, SwitchBoxSide.NORTH)]
+    ic = create_uniform_interconnect(chip_size, chip_size, track_width,
+                                     dummy_col,
+                                     {"data_in": in_conn,
+                                      "data_out": out_conn},
+                                     {1: num_track},
+                                     SwitchBoxType.Wilton,
+                                     pipeline_regs)
+    # USAGE
+    frozen = ic.freeze()
+
+    # TESTS
+    nodes = []
+    for coord in ic:
+        nodes += ic[coord].get_all_nodes()
+    assert len(frozen) == len(nodes)
+    num_edges = 0
+    for node_id, node in enumerate(nodes):
+        assert frozen.get_node(node_id) is node
+        assert frozen.get_id(node) == node_id
+        assert frozen.get_type(node_id) == node.TYPE
+        assert frozen.xs[node_id] == node.x and frozen.ys[node_id] == node.y
+        assert frozen.widths[node_id] == node.width
+        if isinstance(node, SwitchBoxNode):
+            assert frozen.tracks[node_id] == node.track
+            assert frozen.sides[node_id] == node.side.value
+            assert frozen.ios[node_id] == node.io.value
+        elif isinstance(node, PortNode):
+            assert frozen.names[node_id] == node.name
+            assert frozen.tracks[node_id] == -1
+        # forward edges are stored in the neighbor order
+        neighbors = [frozen.get_node(i) for i in frozen.get_neighbors(node_id)]
+        assert neighbors == list(node)
+        delays = list(frozen.get_edge_delays(node_id))
+        assert delays == [node.get_edge_cost(n) for n in node]
+        # reverse edges follow the mux input ordering
+        conn_in = [frozen.get_node(i) for i in frozen.get_conn_in(node_id)]
+        assert conn_in == node.get_conn_in()
+        assert frozen.fan_in(node_id) == len(node.get_conn_in())
+        num_edges += len(node)
+    assert frozen.num_edges == num_edges
+
+
+def test_node_adjacency():
+    width = 16
+    node = PortNode("data_out", 0, 0, width)
+    sbs = [SwitchBoxNode(0, 0, track, width, SwitchBoxSide.NORTH,
+                         SwitchBoxIO.SB_OUT) for track in range(4)]
+    # USAGE
+    for i, sb in enumerate(sbs):
+        node.add_edge(sb, i + 1)
+    node.remove_edge(sbs[1])
+    node.add_edge(sbs[1], 5)
+
+    # TESTS
+    # nodes are slotted to save memory
+    assert not hasattr(node, "__dict__")
+    assert not hasattr(sbs[0], "__dict__")
+    # insertion order is preserved
+    assert list(node) == [sbs[0], sbs[2], sbs[3], sbs[1]]
+    assert len(node) == 4
+    assert node.get_edge_cost(sbs[1]) == 5
+    assert node.get_edge_cost(sbs[3]) == 4
+    for sb in sbs:
+        assert sb.get_conn_in() == [node]
+    node.remove_edge(sbs[0])
+    assert sbs[0] not in node
+    assert node.get_edge_cost(sbs[0]) == MAX_DEFAULT_DELAY
+    assert sbs[0].get_conn_in() == []
+
+
+def test_conn_in_index():
+    width = 16
+    port = PortNode("data_in", 0, 0, width)
+    sbs = [SwitchBoxNode(0, 0, track, width, SwitchBoxSide.WEST,
+                         SwitchBoxIO.SB_IN) for track in range(5)]
+    for sb in sbs[:3]:
+        sb.add_edge(port)
+
+    # USAGE
+    assert port.conn_in_index(sbs[2]) == 2
+
+    # TESTS
+    # the index map has to be updated on add and remove
+    sbs[3].add_edge(port)
+    sbs[0].remove_edge(port)
+    sbs[4].add_edge(port)
+    sbs[0].add_edge(port)
+    conn_in = port.get_conn_in()
+    assert conn_in == [sbs[1], sbs[2], sbs[3], sbs[4], sbs[0]]
+    for sb in sbs:
+        assert port.conn_in_index(sb) == conn_in.index(sb)
+    sbs[2].remove_edge(port)
+    with pytest.raises(ValueError):
+        port.conn_in_index(sbs[2])
+    for sb in port.get_conn_in():
+        assert port.conn_in_index(sb) == conn_in.index(sb)
+
+
+def test_node_registry():
+    chip_size = 3
+    num_track = 2
+    track_width = 16
+
+    def dummy_col(_: int, __: int):
+        return DummyCore()
+
+    ic = create_uniform_interconnect(chip_size, chip_size, track_width,
+                                     dummy_col, {}, {1: num_track},
+                                     SwitchBoxType.Disjoint)
+    # USAGE
+    sb = ic.get_sb(1, 2, SwitchBoxSide.EAST, 1, SwitchBoxIO.SB_OUT)
+    key = NodeKey(NodeType.SwitchBox, 1, 2, 1, SwitchBoxSide.EAST,
+                  SwitchBoxIO.SB_OUT, None, track_width)
+    assert sb.key() == key
+    assert ic.find_node(key) is sb
+    assert InterconnectGraph.locate_node(ic, sb) is sb
+
+    # TESTS
+    # hashes are derived from the key, so transposed coordinates do not
+    # collide
+    sb_t = ic.get_sb(2, 1, SwitchBoxSide.EAST, 1, SwitchBoxIO.SB_OUT)
+    assert hash(sb) == hash(key)
+    assert hash(sb) != hash(sb_t)
+    # ids are dense
+    registry = ic.get_node_registry()
+    ids = [ic.get_node_id(node) for node in registry.nodes]
+    assert ids == list(range(len(registry)))
+    # new nodes are picked up automatically
+    tile = ic[1, 1]
+    tile.switchbox.add_pipeline_register(SwitchBoxSide.NORTH, 0)
+    reg = tile.switchbox.registers["T0_NORTH"]
+    assert ic.find_node(reg.key()) is reg
+    assert reg in ic
+    # one register and one register mux
+    assert len(ic.get_node_registry()) == len(registry) + 2
+    assert ic.find_node(NodeKey(NodeType.Port, 0, 0, None, None, None,
+                                "not_a_port", track_width)) is None
+    # membership is by identity, not by key
+    assert SwitchBoxNode(1, 2, 1, track_width, SwitchBoxSide.EAST,
+                         SwitchBoxIO.SB_OUT) not in ic
+
+
+def test_switch_id():
+    width = 16
+    interconnect = InterconnectGraph(width)
+    wire_fns = [SwitchBoxHelper.get_disjoint_sb_wires,
+                SwitchBoxHelper.get_wilton_sb_wires,
+                SwitchBoxHelper.get_imran_sb_wires]
+    # USAGE
+    expected_ids = []
+    switches = []
+    for x in range(6):
+        for y in range(3):
+            num_track = 1 + (x + y) % 3
+            wires = wire_fns[(x * y) % 3](num_track)
+            tile = Tile.create_tile(x, y, width, num_track, wires)
+            # compute the reference id with a linear scan
+            reference = [set(s.internal_wires) for s in switches]
+            if set(wires) in reference:
+                expected_ids.append(reference.index(set(wires)))
+            else:
+                expected_ids.append(len(switches))
+                switches.append(tile.switchbox)
+            interconnect.add_tile(tile)
+
+    # TESTS
+    ids = [interconnect[x, y].switchbox.id for x in range(6)
+           for y in range(3)]
+    assert ids == expected_ids
+    # the wire order does not matter
+    wires = SwitchBoxHelper.get_wilton_sb_wires(2)
+    switch0 = SwitchBox(0, 0, 2, width, wires)
+    switch1 = SwitchBox(0, 0, 2, width, wires[::-1])
+    assert switch0 == switch1
+    assert switch0.get_fingerprint() == switch1.get_fingerprint()
+    assert switch0 != SwitchBox(0, 0, 2, width, wires[1:])
+
+
+def test_lazy_switchbox():
+    width = 16
+    num_track = 3
+    # USAGE
+    template = WiltonSwitchBox(0, 0, num_track, width)
+    tile = Tile(1, 1, width, template)
+
+    # TESTS
+    # neither the template nor the tile has created the nodes yet
+    assert not template.materialized
+    assert not tile.switchbox.materialized
+    assert tile.switchbox.internal_wires is template.internal_wires
+    sb = tile.get_sb(SwitchBoxSide.WEST, 0, SwitchBoxIO.SB_IN)
+    assert tile.switchbox.materialized
+    assert not template.materialized
+    assert sb.x == 1 and sb.y == 1
+    # same connections as the template
+    for side in SwitchBoxSide:
+        for io in SwitchBoxIO:
+            for track in range(num_track):
+                node = tile.get_sb(side, track, io)
+                ref = template[side, track, io]
+                assert [(n.side, n.track, n.io) for n in node] == \
+                    [(n.side, n.track, n.io) for n in ref]
+                assert [(n.side, n.track, n.io) for n in node.get_conn_in()] \
+                    == [(n.side, n.track, n.io) for n in ref.get_conn_in()]
+    assert len(tile.switchbox.get_all_sbs()) == 2 * 4 * num_track
+
+
+def test_clone():
+    chip_size = 4
+    num_track = 2
+    track_width = 16
+
+    def dummy_col(_: int, __: int):
+        return DummyCore()
+
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    ic = create_uniform_interconnect(chip_size, chip_size, track_width,
+                                     dummy_col,
+                                     {"data_in": in_conn,
+                                      "data_out": out_conn},
+                                     {1: num_track},
+                                     SwitchBoxType.Wilton)
+
+    def get_connections(graph: InterconnectGraph):
+        result = []
+        for coord in graph:
+            for node in graph[coord].get_all_nodes():
+                result.append((node.node_str(),
+                               [(n.node_str(), node.get_edge_cost(n))
+                                for n in node],
+                               [n.node_str() for n in node.get_conn_in()]))
+        return result
+
+    reference = get_connections(ic)
+
+    # USAGE
+    new_ic = ic.clone()
+
+    # TESTS
+    sb = new_ic.get_sb(1, 1, SwitchBoxSide.EAST, 0, SwitchBoxIO.SB_OUT)
+    assert sb is not ic.get_sb(1, 1, SwitchBoxSide.EAST, 0,
+                               SwitchBoxIO.SB_OUT)
+    for node in sb:
+        assert node in new_ic
+        assert node not in ic
+    assert new_ic[1, 1].switchbox.id == ic[1, 1].switchbox.id
+    # an exact copy, including the mux input ordering
+    assert get_connections(new_ic) == reference
+    # mutating the clone does not change the parent graph
+    new_ic[1, 2].switchbox.add_pipeline_register(SwitchBoxSide.NORTH, 0)
+    new_ic[2, 1].switchbox.remove_side_sbs(SwitchBoxSide.EAST,
+                                           SwitchBoxIO.SB_IN)
+    sb.add_edge(new_ic.get_sb(2, 2, SwitchBoxSide.WEST, 1,
+                              SwitchBoxIO.SB_IN))
+    assert get_connections(ic) == reference
+    assert get_connections(new_ic) != reference
+    assert len(ic[2, 1].switchbox.get_all_sbs()) == 8 * num_track
+    # and vice versa
+    new_reference = get_connections(new_ic)
+    ic[3, 3].switchbox.add_pipeline_register(SwitchBoxSide.SOUTH, 1)
+    assert get_connections(new_ic) == new_reference
+    assert get_connections(new_ic.clone()) == new_reference
+
+
+@pytest.mark.parametrize("policy", [InterconnectPolicy.Ignore,
+                                    InterconnectPolicy.PassThrough])
+def test_connect_switchboxes(policy: InterconnectPolicy):
+    width = 16
+    track_info = {2: 1, 1: 2}
+    num_track = 3
+    wires = SwitchBoxHelper.get_wilton_sb_wires(num_track)
+
+    def create_graph():
+        graph = InterconnectGraph(width)
+        for x in range(6):
+            height = 2 if x in {2, 3} else 1
+            for y in range(0, 6, height):
+                if (x, y) == (5, 3):
+                    # leave a hole
+                    continue
+                graph.add_tile(Tile.create_tile(x, y, width, num_track, wires,
+                                                height=height))
+        return graph
+
+    def get_connections(graph: InterconnectGraph):
+        result = []
+        for coord in graph:
+            for node in graph[coord].get_all_nodes():
+                result.append((node.node_str(),
+                               [n.node_str() for n in node],
+                               [n.node_str() for n in node.get_conn_in()]))
+        return result
+
+    # USAGE
+    ic = create_graph()
+    ic.connect_switchboxes(0, 0, 5, 5, track_info, policy)
+
+    # TESTS
+    # identical to connecting each track individually, sorted by length
+    reference = create_graph()
+    reference.connect_switchbox(0, 0, 5, 5, 1, 0, policy)
+    reference.connect_switchbox(0, 0, 5, 5, 1, 1, policy)
+    reference.connect_switchbox(0, 0, 5, 5, 2, 2, policy)
+    assert get_connections(ic) == get_connections(reference)
+    # nothing is connected if any of the lengths does not fit the region
+    ic = create_graph()
+    with pytest.raises(ValueError):
+        ic.connect_switchboxes(0, 0, 5, 5, {1: 1, 3: 1}, policy)
+    assert get_connections(ic) == get_connections(create_graph())
+
+
+def test_pipeline_registers():
+    chip_size = 3
+    num_track = 2
+    track_width = 16
+
+    def dummy_col(_: int, __: int):
+        return DummyCore()
+
+    def create_graph(pipeline_regs=None):
+        # the input port is driven by SB_OUT as well, so that the registered
+        # nodes are one of many mux inputs
+        in_conn = [(side, io) for side in SwitchBoxSide for io in SwitchBoxIO]
+        out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+        return create_uniform_interconnect(chip_size, chip_size, track_width,
+                                           dummy_col,
+                                           {"data_in_16b": in_conn,
+                                            "data_out_16b": out_conn},
+                                           {1: num_track},
+                                           SwitchBoxType.Wilton,
+                                           pipeline_regs)
+
+    def get_connections(graph: InterconnectGraph):
+        result = []
+        for coord in graph:
+            for node in graph[coord].get_all_nodes():
+                result.append((node.node_str(),
+                               [(n.node_str(), node.get_edge_cost(n))
+                                for n in node],
+                               [n.node_str() for n in node.get_conn_in()]))
+        return result
+
+    def get_port_conn_in(graph: InterconnectGraph):
+        port = graph[1, 1].ports["data_in_16b"]
+        return [n.node_str() for n in port.get_conn_in()]
+
+    regs = [(0, SwitchBoxSide.NORTH), (1, SwitchBoxSide.EAST)]
+    ic = create_graph()
+    reference = get_connections(ic)
+    port_reference = get_port_conn_in(ic)
+    sb = ic.get_sb(1, 1, SwitchBoxSide.NORTH, 0, SwitchBoxIO.SB_OUT)
+    index = ic[1, 1].ports["data_in_16b"].conn_in_index(sb)
+    assert 0 < index < len(port_reference) - 1
+
+    # USAGE
+    ic.add_pipeline_registers(regs)
+
+    # TESTS
+    assert get_connections(ic) == get_connections(create_graph(regs))
+    # the register mux has the select value of the sb node
+    port = ic[1, 1].ports["data_in_16b"]
+    reg_mux = ic[1, 1].switchbox.reg_muxs[f"{SwitchBoxSide.NORTH.value}_0"]
+    assert port.conn_in_index(reg_mux) == index
+    assert sb not in port.get_conn_in()
+    with pytest.raises(Exception):
+        ic.add_pipeline_registers({(1, 1): [(0, SwitchBoxSide.NORTH)]})
+    # swap to a per-tile configuration
+    ic.remove_pipeline_registers(regs)
+    assert get_port_conn_in(ic) == port_reference
+    assert get_connections(ic) == reference
+    ic.add_pipeline_registers({(1, 1): [(1, SwitchBoxSide.WEST)]})
+    assert list(ic[1, 1].switchbox.registers) == ["T1_WEST"]
+    assert len(ic[1, 2].switchbox.registers) == 0
+    reg = ic[1, 1].switchbox.registers["T1_WEST"]
+    assert reg in ic
+    registered = get_connections(ic)
+
+    # invalid specs don't change the graph
+    with pytest.raises(Exception):
+        ic.add_pipeline_registers(regs + [(1, SwitchBoxSide.WEST)])
+    with pytest.raises(Exception):
+        ic.add_pipeline_registers({(1, 2): [(0, SwitchBoxSide.NORTH),
+                                            (0, SwitchBoxSide.NORTH)]})
+    with pytest.raises(Exception):
+        ic.add_pipeline_registers({(1, 2): [(0, SwitchBoxSide.NORTH)],
+                                   (chip_size, 0): [(0, SwitchBoxSide.NORTH)]})
+    with pytest.raises(Exception):
+        ic.remove_pipeline_registers({(1, 1): [(1, SwitchBoxSide.WEST),
+                                               (0, SwitchBoxSide.WEST)]})
+    assert get_connections(ic) == registered
+
+    ic.remove_pipeline_registers({(1, 1): [(1, SwitchBoxSide.WEST)]})
+    assert reg not in ic
+    assert get_connections(ic) == reference
+    with pytest.raises(Exception):
+        ic.remove_pipeline_registers({(1, 1): [(1, SwitchBoxSide.WEST)]})
+
+
+def test_reachability():
+    chip_size = 3
+    ic = create_uniform_interconnect(chip_size, chip_size, 16,
+                                     lambda _, __: DummyCore(),
+                                     {"data_in_16b": [(SwitchBoxSide.WEST,
+                                                       SwitchBoxIO.SB_IN)],
+                                      "data_out_16b": [(SwitchBoxSide.EAST,
+                                                        SwitchBoxIO.SB_OUT)]},
+                                     {1: 2},
+                                     SwitchBoxType.Wilton)
+    ports = []
+    for coord in ic:
+        ports += [node for node in ic[coord].get_all_nodes()
+                  if isinstance(node, PortNode)]
+
+    def get_reachable(node_):
+        visited = {node_}
+        working_set = [node_]
+        while working_set:
+            n = working_set.pop()
+            for next_node in n:
+                if next_node not in visited:
+                    visited.add(next_node)
+                    working_set.append(next_node)
+        return visited
+
+    # USAGE
+    index = ic.get_reachability()
+
+    # TESTS
+    for src in ports:
+        reachable = get_reachable(src)
+        for dst in ports:
+            assert index.is_reachable(src, dst) == (dst in reachable)
+        assert set(index.get_reachable_ports(src)) == \
+            {port for port in ports if port in reachable}
+    # an output port can't reach another output port
+    out_0 = ic.get_port(0, 0, "data_out_16b")
+    out_1 = ic.get_port(1, 0, "data_out_16b")
+    in_1 = ic.get_port(1, 0, "data_in_16b")
+    assert not ic.is_reachable(out_0, out_1)
+    assert ic.is_reachable(out_0, in_1)
+    with pytest.raises(ValueError):
+        index.is_reachable(out_0, ic[0, 0].get_sb(SwitchBoxSide.NORTH, 0,
+                                                  SwitchBoxIO.SB_IN))
+    # the index is rebuilt once the connections change
+    assert ic.get_reachability() is index
+    for node in list(out_0):
+        out_0.remove_edge(node)
+    assert ic.get_reachability() is not index
+    assert not ic.is_reachable(out_0, in_1)
+    assert ic.get_reachability().get_reachable_ports(out_0) == [out_0]
+
+
+def test_stats():
+    chip_size = 3
+    pipeline_regs = [(0, SwitchBoxSide.NORTH)]
+    ic = create_uniform_interconnect(chip_size, chip_size, 16,
+                                     lambda _, __: DummyCore(),
+                                     {"data_in_16b": [(SwitchBoxSide.WEST,
+                                                       SwitchBoxIO.SB_IN)],
+                                      "data_out_16b": [(SwitchBoxSide.EAST,
+                                                        SwitchBoxIO.SB_OUT)]},
+                                     {1: 2},
+                                     SwitchBoxType.Wilton,
+                                     pipeline_regs)
+    nodes = []
+    for coord in ic:
+        nodes += ic[coord].get_all_nodes()
+
+    # USAGE
+    stats = ic.get_stats()
+
+    # TESTS
+    assert stats.total_nodes == len(nodes)
+    for kind in NodeType:
+        count = len([node for node in nodes if node.TYPE == kind])
+        assert stats.num_nodes.get(kind, 0) == count
+    assert stats.num_edges == sum([len(node) for node in nodes])
+    assert sum(stats.fan_out.values()) == len(nodes)
+    assert stats.fan_in[len(nodes[0].get_conn_in())] > 0
+    config_bits = {}
+    for node in nodes:
+        height = len(node.get_conn_in())
+        if isinstance(node, PortNode) and len(node) > 0:
+            continue
+        if height > 1:
+            coord = (node.x, node.y)
+            config_bits[coord] = config_bits.get(coord, 0) + \
+                (height - 1).bit_length()
+    assert stats.config_bits == config_bits
+    assert stats.total_memory > 0
+    # stats of multiple graphs add up
+    total = GraphStats.combine([stats, stats])
+    assert total.num_edges == stats.num_edges * 2
+    assert total.total_config_bits == stats.total_config_bits * 2
+
+
+@pytest.mark.parametrize("sb_type", [SwitchBoxType.Disjoint,
+                                     SwitchBoxType.Wilton,
+                                     SwitchBoxType.Imran])
+def test_load_graph(sb_type: SwitchBoxType):
+    chip_size = 4
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    pipeline_regs = [(1, SwitchBoxSide.EAST), (0, SwitchBoxSide.NORTH)]
+    ic = create_uniform_interconnect(chip_size, chip_size, 16,
+                                     lambda _, __: DummyCore(),
+                                     {"data_in_16b": in_conn,
+                                      "data_out_16b": out_conn},
+                                     {1: 3},
+                                     sb_type,
+                                     pipeline_regs,
+                                     io_sides=IOSide.North | IOSide.West,
+                                     io_conn={"in": {"data_in_16b": [0, 1]},
+                                              "out": {"data_out_16b": [0]}})
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = os.path.join(tempdir, "16.graph")
+        ic.dump_graph(filename)
+
+        # USAGE
+        graph = InterconnectGraph.load_graph(filename)
+
+        # TESTS
+        new_filename = os.path.join(tempdir, "16_new.graph")
+        graph.dump_graph(new_filename)
+        assert filecmp.cmp(filename, new_filename, shallow=False)
+
+    assert graph.bit_width == ic.bit_width
+    assert list(graph) == list(ic)
+    for coord in ic:
+        assert graph[coord].switchbox.id == ic[coord].switchbox.id
+        for node in ic[coord].get_all_nodes():
+            if len(node) == 0 and len(node.get_conn_in()) == 0:
+                # unused nodes are not part of the dump
+                continue
+            new_node = graph.find_node(node.key())
+            assert [n.key() for n in new_node] == [n.key() for n in node]
+
+
+def test_binary_graph():
+    chip_size = 3
+    ic = create_uniform_interconnect(chip_size, chip_size, 16,
+                                     lambda _, __: DummyCore(),
+                                     {"data_in_16b": [(SwitchBoxSide.WEST,
+                                                       SwitchBoxIO.SB_IN)],
+                                      "data_out_16b": [(SwitchBoxSide.EAST,
+                                                        SwitchBoxIO.SB_OUT)]},
+                                     {1: 2},
+                                     SwitchBoxType.Wilton,
+                                     [(0, SwitchBoxSide.NORTH)])
+    frozen = ic.freeze()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = os.path.join(tempdir, "16.bin")
+        ic.dump_binary(filename)
+
+        # USAGE
+        with MappedGraph(filename) as graph:
+
+            # TESTS
+            assert graph.bit_width == 16
+            assert len(graph) == len(frozen)
+            assert graph.num_edges == frozen.num_edges
+            for node_id in range(len(frozen)):
+                node = frozen.get_node(node_id)
+                assert graph.get_node(node_id).key() == node.key()
+                assert graph.get_node(node_id) is graph.get_node(node_id)
+                assert graph.get_id(node) == node_id
+                assert graph.get_type(node_id) == node.TYPE
+                assert graph.get_name(node_id) == frozen.names[node_id]
+                assert list(graph.get_neighbors(node_id)) == \
+                    list(frozen.get_neighbors(node_id))
+                assert list(graph.get_edge_delays(node_id)) == \
+                    list(frozen.get_edge_delays(node_id))
+                assert list(graph.get_conn_in(node_id)) == \
+                    list(frozen.get_conn_in(node_id))
+            tiles = list(graph.get_tiles())
+            switches = graph.get_switches()
+            assert len(tiles) == chip_size * chip_size
+            for x, y, height, switch_id in tiles:
+                switchbox = ic[x, y].switchbox
+                assert height == ic[x, y].height
+                assert switch_id == switchbox.id
+                assert switches[switch_id] == (switchbox.num_track,
+                                               switchbox.internal_wires)
+            # the mapped graph can be used for analysis directly
+            index = ReachabilityIndex(graph)
+            src = graph.get_node(frozen.get_id(ic.get_port(0, 0,
+                                                           "data_out_16b")))
+            dst = graph.get_node(frozen.get_id(ic.get_port(2, 2,
+                                                           "data_in_16b")))
+            assert index.is_reachable(src, dst) == ic.is_reachable(
+                ic.get_port(0, 0, "data_out_16b"),
+                ic.get_port(2, 2, "data_in_16b"))
+
+
+def test_load_binary():
+    chip_size = 4
+    ic = create_uniform_interconnect(chip_size, chip_size, 16,
+                                     lambda _, __: DummyCore(),
+                                     {"data_in_16b": [(SwitchBoxSide.WEST,
+                                                       SwitchBoxIO.SB_IN)],
+                                      "data_out_16b": [(SwitchBoxSide.EAST,
+                                                        SwitchBoxIO.SB_OUT)]},
+                                     {1: 3},
+                                     SwitchBoxType.Imran,
+                                     [(0, SwitchBoxSide.NORTH)])
+    ic[1, 1].switchbox.remove_side_sbs(SwitchBoxSide.SOUTH,
+                                       SwitchBoxIO.SB_OUT)
+    sb = ic.get_sb(2, 2, SwitchBoxSide.EAST, 1, SwitchBoxIO.SB_OUT)
+    sb.add_edge(ic.get_port(2, 2, "data_in_16b"), 3)
+    frozen = ic.freeze()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename = os.path.join(tempdir, "16.bin")
+        ic.dump_binary(filename)
+
+        # USAGE
+        graph = InterconnectGraph.load_binary(filename,
+                                              lambda x, y: ic[x, y].core)
+
+        # TESTS
+        # same nodes, connections, delays and mux input order
+        loaded = graph.freeze()
+        for column in ("kinds", "xs", "ys", "tracks", "sides", "ios",
+                       "offsets", "targets", "edge_delays", "rev_offsets",
+                       "rev_sources"):
+            assert getattr(loaded, column) == getattr(frozen, column)
+        assert loaded.names == frozen.names
+        assert graph.get_size() == ic.get_size()
+        for coord in ic:
+            assert graph[coord].core is ic[coord].core
+            assert graph[coord].switchbox.id == ic[coord].switchbox.id
+            assert list(graph[coord].inputs) == list(ic[coord].inputs)
+        assert graph.get_sb(1, 1, SwitchBoxSide.SOUTH, 0,
+                            SwitchBoxIO.SB_OUT) is None
+        assert len(graph[2, 2].switchbox.registers) == 1
+        filename1 = os.path.join(tempdir, "1.graph")
+        filename2 = os.path.join(tempdir, "2.graph")
+        ic.dump_graph(filename1)
+        graph.dump_graph(filename2)
+        assert filecmp.cmp(filename1, filename2, shallow=False)
+
+
+def test_pickle():
+    chip_size = 8
+    ic = create_uniform_interconnect(chip_size, chip_size, 16,
+                                     lambda _, __: DummyCore(),
+                                     {"data_in_16b": [(SwitchBoxSide.WEST,
+                                                       SwitchBoxIO.SB_IN)],
+                                      "data_out_16b": [(SwitchBoxSide.EAST,
+                                                        SwitchBoxIO.SB_OUT)]},
+                                     {1: 5},
+                                     SwitchBoxType.Imran,
+                                     [(0, SwitchBoxSide.NORTH)])
+    ic[1, 1].switchbox.remove_side_sbs(SwitchBoxSide.SOUTH,
+                                       SwitchBoxIO.SB_OUT)
+    sb = ic.get_sb(2, 2, SwitchBoxSide.EAST, 1, SwitchBoxIO.SB_OUT)
+    sb.add_edge(ic.get_port(2, 2, "data_in_16b"), 3)
+    cores = {coord: ic[coord].core for coord in ic}
+    frozen = ic.freeze()
+
+    # USAGE
+    graph = pickle.loads(pickle.dumps(ic))
+
+    # TESTS
+    loaded = graph.freeze()
+    for column in ("kinds", "xs", "ys", "tracks", "sides", "ios", "offsets",
+                   "targets", "edge_delays", "rev_offsets", "rev_sources"):
+        assert getattr(loaded, column) == getattr(frozen, column)
+    assert loaded.names == frozen.names
+    for coord in ic:
+        # the graph that was pickled keeps its cores
+        assert ic[coord].core is cores[coord]
+        assert isinstance(graph[coord].core, CoreSignature)
+        assert graph[coord].core == CoreSignature(ic[coord].core)
+        assert graph[coord].core.inputs() == ic[coord].core.inputs()
+        assert graph[coord].switchbox.id == ic[coord].switchbox.id
+        assert list(graph[coord].inputs) == list(ic[coord].inputs)
+    with tempfile.TemporaryDirectory() as tempdir:
+        filename1 = os.path.join(tempdir, "1.graph")
+        filename2 = os.path.join(tempdir, "2.graph")
+        ic.dump_graph(filename1)
+        graph.dump_graph(filename2)
+        assert filecmp.cmp(filename1, filename2, shallow=False)
+    # graphs are shipped as bytes as well
+    graph = InterconnectGraph.load_bytes(ic.dump_bytes())
+    assert graph.freeze().targets == frozen.targets
+    assert graph[1, 1].core is None
@@ -3,6 +3,8 @@ from gemstone.common.dummy_core_magma import DummyCore
 from gemstone.common.testers import BasicTester
 from canal.checker import check_graph_isomorphic
 from canal.interconnect import *
+from canal.cyclone import PortNode
+from canal.circuit import get_mux_sel_name
 import tempfile
 import fault.random
 from canal.util import create_uniform_interconnect, SwitchBoxType, IOSide
@@ -253,6 +255,119 @@ def test_interconnect(num_tracks: int, chip_size: int,
         check_graph_isomorphic(ics, rtl_path)
 
 
+def test_tile_definitions():
+    chip_size = 4
+    num_tracks = 2
+    # USAGE
+    _, _, ics, interconnect = create_dummy_cgra(chip_size, num_tracks, True,
+                                                GlobalSignalWiring.Fanout)
+
+    # TESTS
+    # corners, sides and the interior
+    assert len(interconnect.tile_definitions) == 9
+    for signature, definition in interconnect.tile_definitions.items():
+        assert definition.definition is None
+        assert not definition.is_cloned
+        assert TileCircuit.get_signature(definition.tiles) == signature
+    num_clones = 0
+    for (x, y), tile_circuit in interconnect.tile_circuits.items():
+        for tile in tile_circuit.tiles.values():
+            assert_tile_coordinate(tile, x, y)
+        definition = tile_circuit.definition
+        if definition is None:
+            continue
+        num_clones += 1
+        assert tile_circuit.is_cloned
+        assert interconnect.tile_definitions[
+            TileCircuit.get_signature(tile_circuit.tiles)] is definition
+        assert tile_circuit.finalized
+        assert sorted(tile_circuit.ports) == sorted(definition.ports)
+        # the configuration addresses are the same as the ones of the
+        # definition
+        for bit_width, tile in tile_circuit.tiles.items():
+            src = tile.get_sb(SwitchBoxSide.WEST, 0, SwitchBoxIO.SB_IN)
+            dst = tile.get_sb(SwitchBoxSide.EAST, 0, SwitchBoxIO.SB_OUT)
+            definition_tile = definition.tiles[bit_width]
+            definition_src = definition_tile.get_sb(SwitchBoxSide.WEST, 0,
+                                                    SwitchBoxIO.SB_IN)
+            definition_dst = definition_tile.get_sb(SwitchBoxSide.EAST, 0,
+                                                    SwitchBoxIO.SB_OUT)
+            reg_addr, feat_addr, data = \
+                tile_circuit.get_route_bitstream_config(src, dst)
+            assert (reg_addr, feat_addr, data) == \
+                definition.get_route_bitstream_config(definition_src,
+                                                      definition_dst)
+            assert interconnect.get_node_bitstream_config(src, dst) == \
+                (interconnect.get_config_addr(reg_addr, feat_addr, x, y),
+                 data)
+    assert num_clones == chip_size * chip_size - 9
+
+
+@pytest.mark.parametrize("reg_mode", [True, False])
+def test_route_configs(reg_mode: bool):
+    chip_size = 4
+    num_tracks = 2
+    # USAGE
+    # the global signal pass runs after the interconnect is finalized
+    bit_widths, _, ics, interconnect = create_dummy_cgra(
+        chip_size, num_tracks, reg_mode, GlobalSignalWiring.Fanout)
+
+    # TESTS
+    # every mux input of the graphs is in the table, with the register of
+    # its mux, the feature of the circuit and its index as the data
+    for bit_width in bit_widths:
+        graph = ics[bit_width]
+        for coord in graph:
+            if coord not in interconnect.tile_circuits:
+                continue
+            tile_circuit = interconnect.tile_circuits[coord]
+            route_configs = tile_circuit.get_route_configs()
+            num_configs = 0
+            for dst_node in graph[coord].get_all_nodes():
+                if isinstance(dst_node, PortNode):
+                    circuit = tile_circuit.cbs.get(dst_node.name)
+                elif isinstance(dst_node, (SwitchBoxNode, RegisterMuxNode)):
+                    circuit = tile_circuit.sbs[bit_width]
+                else:
+                    continue
+                if circuit is None or len(dst_node.get_conn_in()) < 2:
+                    continue
+                config_names = sorted(circuit.registers.keys())
+                reg_addr = config_names.index(get_mux_sel_name(dst_node))
+                feat_addr = tile_circuit.features().index(circuit)
+                for data, src_node in enumerate(dst_node.get_conn_in()):
+                    expected = reg_addr, feat_addr, data
+                    assert route_configs[(src_node, dst_node)] == expected
+                    assert tile_circuit.get_route_bitstream_config(
+                        src_node, dst_node) == expected
+                    addr = interconnect.get_config_addr(reg_addr, feat_addr,
+                                                        *coord)
+                    assert interconnect.get_node_bitstream_config(
+                        src_node, dst_node) == (addr, data)
+                    num_configs += 1
+            assert len([key for key in route_configs
+                        if key[1].width == bit_width]) == num_configs
+
+    # connections that are not in the table still fail the checks
+    tile_circuit = interconnect.tile_circuits[(1, 1)]
+    sb_ins = [sb_node for sb_node in
+              tile_circuit.tiles[bit_widths[0]].switchbox.get_all_sbs()
+              if sb_node.io == SwitchBoxIO.SB_IN]
+    src_node, dst_node = sb_ins[0], sb_ins[1]
+    assert dst_node not in src_node
+    with pytest.raises(AssertionError):
+        tile_circuit.get_route_bitstream_config(src_node, dst_node)
+
+    # adding a feature drops the table
+    tile_circuit = interconnect.tile_circuits[(1, 1)]
+    route_configs = tile_circuit.get_route_configs()
+    assert tile_circuit.get_route_configs() is route_configs
+    tile_circuit.add_feature(tile_circuit.sbs[bit_widths[0]])
+    assert tile_circuit.get_route_configs() is not route_configs
+    # the feature address is the first one, as in features().index()
+    assert tile_circuit.get_route_configs() == route_configs
+
+
 def test_dump_pnr():
     num_tracks = 2
     addr_width = 8
@@ -309,6 +424,14 @@ def test_dump_pnr():
         assert os.path.isfile(os.path.join(tempdir, "16.graph"))
         assert os.path.isfile(os.path.join(tempdir, f"{design_name}.layout"))
 
+        # the process pool writes the same files
+        with tempfile.TemporaryDirectory() as pool_dir:
+            interconnect.dump_pnr(pool_dir, design_name, max_workers=2)
+            for filename in ("1.graph", "16.graph", f"{design_name}.layout"):
+                assert filecmp.cmp(os.path.join(tempdir, filename),
+                                   os.path.join(pool_dir, filename),
+                                   shallow=False)
+
 
 @pytest.mark.parametrize("num_cfg", [1, 2, 4])
 def test_parallel_meso_wiring(num_cfg: int):
@@ -0,0 +1,77 @@
+from gemstone.common.dummy_core_magma import DummyCore
+from canal.cyclone import SwitchBoxSide, SwitchBoxIO
+from canal.router import Router
+from canal.util import create_uniform_interconnect, SwitchBoxType
+import pytest
+
+
+def create_graph(chip_size: int, num_track: int):
+    track_width = 16
+
+    def dummy_col(_: int, __: int):
+        return DummyCore()
+
+    in_conn = [(side, SwitchBoxIO.SB_IN) for side in SwitchBoxSide]
+    out_conn = [(side, SwitchBoxIO.SB_OUT) for side in SwitchBoxSide]
+    return create_uniform_interconnect(chip_size, chip_size, track_width,
+                                       dummy_col,
+                                       {"data_in_16b": in_conn,
+                                        "data_out_16b": out_conn},
+                                       {1: num_track},
+                                       SwitchBoxType.Disjoint)
+
+
+def check_routes(nets, routes):
+    assert set(routes.keys()) == set(nets.keys())
+    used = {}
+    for net_id, route in routes.items():
+        src, sinks = nets[net_id]
+        assert len(route) == len(sinks)
+        for segment, sink in zip(route, sinks):
+            assert segment[0] is src
+            assert segment[-1] is sink
+            for i in range(len(segment) - 1):
+                assert segment[i + 1] in segment[i]
+        # nodes are not shared between nets
+        for node in {node for segment in route for node in segment}:
+            assert node not in used
+            used[node] = net_id
+
+
+@pytest.mark.parametrize("num_track", [2, 3])
+def test_route(num_track: int):
+    chip_size = 4
+    ic = create_graph(chip_size, num_track)
+    nets = {}
+    # every tile sends data to the tile on the opposite corner
+    for x in range(chip_size):
+        for y in range(chip_size):
+            src = ic.get_port(x, y, "data_out_16b")
+            sink = ic.get_port(chip_size - 1 - x, chip_size - 1 - y,
+                               "data_in_16b")
+            nets[f"e{len(nets)}"] = (src, [sink])
+    # one net with multiple sinks
+    src, _ = nets["e0"]
+    nets["e0"] = (src, [ic.get_port(chip_size - 1, chip_size - 1,
+                                    "data_in_16b"),
+                        ic.get_port(1, 0, "data_in_16b")])
+    nets.pop("e11")
+
+    # USAGE
+    routes = Router(ic).route(nets)
+
+    # TESTS
+    check_routes(nets, routes)
+    # the route of a multi-sink net is a tree
+    route = routes["e0"]
+    assert route[0][0] is route[1][0]
+
+
+def test_route_conflict():
+    ic = create_graph(2, 1)
+    src = ic.get_port(0, 0, "data_out_16b")
+    sink = ic.get_port(1, 1, "data_in_16b")
+    nets = {"e0": (src, [sink]),
+            "e1": (ic.get_port(1, 0, "data_out_16b"), [sink])}
+    with pytest.raises(ValueError):
+        Router(ic).route(nets)
@@ -90,3 +90,25 @@ def test_empty_tile_util():
     with tempfile.TemporaryDirectory() as tempdir:
         filename = os.path.join(tempdir, "interconnect")
         magma.compile(filename, circuit, output="coreir-verilog")
+
+
+def test_array_layout():
+    width, height = 6, 5
+    sides = IOSide.North | IOSide.West
+    track_info = {1: 2, 2: 1}
+    layout = ArrayLayout(width, height, sides, track_info)
+    x_min, x_max, y_min, y_max = get_array_size(width, height, sides)
+    for x in range(width):
+        for y in range(height):
+            if x_min <= x <= x_max and y_min <= y <= y_max:
+                assert layout.is_interior(x, y)
+                assert layout.get_io_side(x, y) is None
+                assert layout.get_num_tracks(x, y) == \
+                    compute_num_tracks(x_min, y_min, x, y, track_info)
+            else:
+                assert not layout.is_interior(x, y)
+                assert layout.get_num_tracks(x, y) == 0
+    assert layout.get_io_side(0, 0) == SwitchBoxSide.WEST
+    assert layout.get_io_side(3, 0) == SwitchBoxSide.NORTH
+    margins = [(x, y) for x, y, _ in layout.get_margin_tiles()]
+    assert len(margins) == width + height - 1